@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# asyncssh_transport.py — exercise the asyncssh Linux transport against an
+# in-process SSH server stand-in (no real host needed)
+#
+#   python3 benchmarks/asyncssh_transport.py                  # 1000 commands, 20 ms each
+#   python3 benchmarks/asyncssh_transport.py --commands 5000 --latency 0.05 --channels 16
+#
+# Commands cycle through --distinct variants: the first time a command is seen
+# Genie spends tens of milliseconds looking for a parser (cached afterwards),
+# which would otherwise dominate the measurement.
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+
+import asyncssh
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVERS_DIR)
+
+USERNAME, PASSWORD = "bench", "bench"
+
+TESTBED = """\
+devices:
+  SSHSIM:
+    os: linux
+    type: linux
+    credentials:
+      default:
+        username: {username}
+        password: {password}
+    connections:
+      cli:
+        protocol: ssh
+        ip: 127.0.0.1
+        port: {port}
+    custom:
+      transport: asyncssh
+"""
+
+
+class StandInServer(asyncssh.SSHServer):
+    def begin_auth(self, username: str) -> bool:
+        return True
+
+    def password_auth_supported(self) -> bool:
+        return True
+
+    def validate_password(self, username: str, password: str) -> bool:
+        return (username, password) == (USERNAME, PASSWORD)
+
+
+def make_process_handler(latency: float):
+    """A tiny 'shell': echo, seq, sleep, false and exit N; anything else is echoed back."""
+
+    async def handle(process: asyncssh.SSHServerProcess) -> None:
+        command = (process.command or "").strip()
+        name, _, arg = command.partition(" ")
+        await asyncio.sleep(latency)
+        status = 0
+        if name == "echo":
+            process.stdout.write(arg + "\n")
+        elif name == "seq":
+            process.stdout.write("\n".join(str(i) for i in range(1, int(arg) + 1)) + "\n")
+        elif name == "sleep":
+            await asyncio.sleep(float(arg))
+        elif name == "false":
+            status = 1
+        elif name == "exit":
+            status = int(arg or 0)
+            process.stderr.write(f"exiting with {status}\n")
+        else:
+            process.stdout.write(f"ran: {command}\n")
+        process.exit(status)
+
+    return handle
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run(args, server) -> None:
+    ssh_server = await asyncssh.create_server(
+        StandInServer, "127.0.0.1", args.port,
+        server_host_keys=[asyncssh.generate_private_key("ssh-ed25519")],
+        process_factory=make_process_handler(args.latency),
+    )
+
+    # Behaviour checks.
+    result = await server.run_linux_command_async("SSHSIM", "echo hello")
+    assert result["status"] == "completed" and result["output"] == "hello", result
+    result = await server.run_linux_command_async("SSHSIM", "exit 3")
+    assert result["exit_status"] == 3 and "exiting" in result["stderr"], result
+    result = await server.run_linux_command_async("SSHSIM", "sleep 5", timeout=1)
+    assert result["status"] == "error" and "timed out" in result["error"], result
+    print("checks: ok (output, exit status, stderr, timeout)")
+
+    threads_before = threading.active_count()
+    peak_threads = threads_before
+    latencies = []
+
+    async def one(i: int) -> None:
+        nonlocal peak_threads
+        t0 = time.perf_counter()
+        word = str(i % args.distinct)
+        result = await server.run_linux_command_async("SSHSIM", f"echo {word}")
+        latencies.append(time.perf_counter() - t0)
+        peak_threads = max(peak_threads, threading.active_count())
+        assert result["output"] == word, result
+
+    # Warm the parser cache for every variant.
+    await asyncio.gather(*(server.run_linux_command_async("SSHSIM", f"echo {i}") for i in range(args.distinct)))
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.commands)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    print(f"commands:  {args.commands} ({server.ASYNCSSH_MAX_CHANNELS} channels, "
+          f"{args.latency * 1000:.0f} ms stand-in latency)")
+    print(f"elapsed:   {elapsed:.2f} s  ({args.commands / elapsed:.0f} commands/s)")
+    print(f"latency:   p50 {statistics.median(latencies) * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"threads:   {threads_before} before, {peak_threads} peak")
+    print(f"transport: {server._ASYNCSSH.stats()}")
+
+    await server._ASYNCSSH.close_all()
+    ssh_server.close()
+    await ssh_server.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the asyncssh Linux transport")
+    parser.add_argument("--commands", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the stand-in takes per command")
+    parser.add_argument("--distinct", type=int, default=16, help="distinct commands to cycle through")
+    parser.add_argument("--channels", type=int, default=None, help="PYATS_ASYNCSSH_MAX_CHANNELS")
+    args = parser.parse_args()
+    args.port = free_port()
+
+    with tempfile.TemporaryDirectory(prefix="pyats-ssh-bench-") as tmp:
+        testbed = os.path.join(tmp, "testbed.yaml")
+        with open(testbed, "w") as f:
+            f.write(TESTBED.format(username=USERNAME, password=PASSWORD, port=args.port))
+        os.environ["PYATS_TESTBED_PATH"] = testbed
+        if args.channels:
+            os.environ["PYATS_ASYNCSSH_MAX_CHANNELS"] = str(args.channels)
+
+        import server  # noqa: E402  (reads the environment at import)
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# clean_output.py — compare clean_output() with the previous implementation
+#
+#   python3 benchmarks/clean_output.py              # ~5 MB synthetic `show run brief`
+#   python3 benchmarks/clean_output.py --mb 20
+
+import os
+import re
+import sys
+import time
+import string
+import argparse
+import statistics
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVERS_DIR)
+os.environ.setdefault("PYATS_TESTBED_PATH", os.path.join(SERVERS_DIR, "testbed.yaml"))
+
+import server  # noqa: E402
+from fixtures import running_config  # noqa: E402
+
+
+def legacy_clean_output(output: str) -> str:
+    """clean_output() as it was before the table-driven rewrite."""
+    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+    output = ansi_escape.sub("", output)
+    return "".join(c for c in output if c in string.printable)
+
+
+def stream_clean(chunks) -> str:
+    """What the framed shell does with each read."""
+    sanitizer = server.OutputSanitizer()
+    parts = [sanitizer.feed(chunk) for chunk in chunks]
+    parts.append(sanitizer.flush())
+    return "".join(parts)
+
+
+def time_it(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark clean_output()")
+    parser.add_argument("--mb", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk", type=int, default=64 * 1024, help="chunk size for the streaming run")
+    args = parser.parse_args()
+
+    raw = running_config(args.mb)
+    chunks = [raw[i:i + args.chunk] for i in range(0, len(raw), args.chunk)]
+
+    expected = legacy_clean_output(raw)
+    assert server.clean_output(raw) == expected, "clean_output() differs from legacy output"
+    assert stream_clean(chunks) == expected, "streaming output differs"
+
+    legacy = time_it(lambda: legacy_clean_output(raw), args.repeat)
+    current = time_it(lambda: server.clean_output(raw), args.repeat)
+    streaming = time_it(lambda: stream_clean(chunks), args.repeat)
+
+    print(f"input: {len(raw) / 1024 / 1024:.1f} MiB, {len(chunks)} chunks of {args.chunk} chars")
+    print(f"legacy     {legacy * 1000:>9.1f} ms")
+    print(f"current    {current * 1000:>9.1f} ms  ({legacy / current:.1f}x)")
+    print(f"streaming  {streaming * 1000:>9.1f} ms  ({legacy / streaming:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
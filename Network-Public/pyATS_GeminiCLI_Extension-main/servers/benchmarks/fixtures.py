@@ -0,0 +1,97 @@
+# fixtures.py — offline payloads for the benchmarks
+#
+# Synthetic data shaped like real Genie parse output and raw CLI captures.
+# Recorded captures can be used instead: drop `<name>.json` (Genie parse
+# output) and `<name>.txt` (raw CLI text) files into a directory and pass
+# it to suite.py with --fixtures.
+
+import os
+import json
+from typing import Any, Dict
+
+
+def interface_brief(count: int) -> dict:
+    """Shape of `show ip interface brief` as parsed by Genie."""
+    return {
+        "interface": {
+            f"GigabitEthernet{i}": {
+                "ip_address": f"10.{i // 256}.{i % 256}.1",
+                "interface_is_ok": "YES",
+                "method": "manual",
+                "status": "up" if i % 7 else "administratively down",
+                "protocol": "up" if i % 7 else "down",
+            }
+            for i in range(1, count + 1)
+        }
+    }
+
+
+def route_table(count: int) -> dict:
+    """Shape of `show ip route` as parsed by Genie."""
+    routes = {}
+    for i in range(count):
+        prefix = f"{10 + i // 65536}.{(i // 256) % 256}.{i % 256}.0/24"
+        routes[prefix] = {
+            "route": prefix,
+            "active": True,
+            "source_protocol_codes": "O",
+            "source_protocol": "ospf",
+            "route_preference": 110,
+            "metric": 2 + i % 50,
+            "next_hop": {
+                "next_hop_list": {
+                    1: {
+                        "index": 1,
+                        "next_hop": f"192.168.{i % 4}.2",
+                        "outgoing_interface": f"GigabitEthernet{i % 4 + 1}",
+                        "updated": "1w2d",
+                    }
+                }
+            },
+        }
+    return {"vrf": {"default": {"address_family": {"ipv4": {"routes": routes}}}}}
+
+
+def running_config(target_mb: float) -> str:
+    """Cat9k-style running config with the odd escape code, bell and non-ASCII byte."""
+    stanza = (
+        "interface GigabitEthernet1/0/{n}\r\n"
+        " description \x1b[1mACCESS-PORT-{n}\x1b[0m café\r\n"
+        " switchport access vlan {vlan}\r\n"
+        " switchport mode access\r\n"
+        " spanning-tree portfast\x07\r\n"
+        "!\r\n"
+    )
+    parts = []
+    size = 0
+    n = 0
+    while size < target_mb * 1024 * 1024:
+        block = stanza.format(n=n % 48 + 1, vlan=100 + n % 200)
+        parts.append(block)
+        size += len(block)
+        n += 1
+    return "".join(parts)
+
+
+def default_fixtures() -> Dict[str, Any]:
+    """Small interface table, full routing table and a multi-MB running config."""
+    return {
+        "interface_brief_small": interface_brief(24),
+        "route_table_full": route_table(50_000),
+        "running_config_5mb": running_config(5.0),
+    }
+
+
+def load_fixtures(directory: str) -> Dict[str, Any]:
+    """Load recorded `*.json` parse outputs and `*.txt` raw captures from `directory`."""
+    fixtures: Dict[str, Any] = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        stem, ext = os.path.splitext(name)
+        if ext == ".json":
+            with open(path) as f:
+                fixtures[stem] = json.load(f)
+        elif ext == ".txt":
+            with open(path, errors="replace") as f:
+                fixtures[stem] = f.read()
+    return fixtures
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# suite.py — offline micro-benchmarks for the server's non-device hot paths
+#
+#   python3 benchmarks/suite.py                      # run, compare with baseline.json if present
+#   python3 benchmarks/suite.py --save-baseline      # run and store results as the new baseline
+#   python3 benchmarks/suite.py --fixtures ~/captures --only route
+#
+# Stages timed per fixture: make_json_safe, json.dumps(indent=2), TOON
+# encode, count_tokens (uncached; skipped when the tokenizer is unavailable),
+# toon_with_stats end to end, and clean_output for raw CLI text. The
+# show-command safety checks are timed over a batch of realistic commands.
+# Each stage reports the median wall time and the peak traced memory of a
+# separate run. Exit status is 1 when a stage regresses past --tolerance.
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(SERVERS_DIR, "benchmarks")
+sys.path.insert(0, SERVERS_DIR)
+os.environ.setdefault("PYATS_TESTBED_PATH", os.path.join(SERVERS_DIR, "testbed.yaml"))
+
+import server  # noqa: E402
+import fixtures  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+SHOW_COMMANDS = [
+    "show ip interface brief",
+    "show ip route",
+    "show ip ospf neighbor",
+    "show ip bgp summary",
+    "show interfaces GigabitEthernet1",
+    "show version",
+    "show inventory",
+    "show cdp neighbors detail",
+    "show running-config | include hostname",
+    "show logging last 100",
+    "show platform hardware qfp active statistics drop",
+    "configure terminal",
+]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def uncached(fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Drop count_tokens' content cache first so every sample really tokenizes."""
+    def run():
+        with server._token_cache_lock:
+            server._token_cache.clear()
+        return fn()
+    return run
+
+
+def stages_for(data: Any) -> Dict[str, Callable[[], Any]]:
+    if isinstance(data, str):
+        cleaned = server.clean_output(data)
+        return {
+            "clean_output": lambda: server.clean_output(data),
+            "toon_with_stats": uncached(lambda: server.toon_with_stats({"raw_output": cleaned})),
+        }
+
+    safe = server.make_json_safe(data)
+    json_str = json.dumps(safe, indent=2)
+    stages = {
+        "make_json_safe": lambda: server.make_json_safe(data),
+        "json_dumps_indent": lambda: json.dumps(safe, indent=2),
+        "toon_encode": lambda: server.encode_toon(safe, json_str),
+    }
+    if server.count_tokens("probe") >= 0:
+        stages["count_tokens_exact"] = uncached(lambda: server.count_tokens(json_str))
+    stages["toon_with_stats"] = uncached(lambda: server.toon_with_stats(data))
+    return stages
+
+
+def command_checks(batch: int) -> Callable[[], Any]:
+    commands = SHOW_COMMANDS * batch
+
+    def run():
+        for command in commands:
+            server._check_show_command(command)
+    return run
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> list:
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, floor in (("median_ms", 1.0), ("peak_kib", 64.0)):
+            old, new = base.get(metric), stats.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor:
+                regressions.append(f"{name} {metric}: {old} -> {new} (+{100 * (new / old - 1):.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for server.py hot paths")
+    parser.add_argument("--fixtures", help="directory of recorded *.json / *.txt captures")
+    parser.add_argument("--only", help="run only benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    data = fixtures.load_fixtures(args.fixtures) if args.fixtures else fixtures.default_fixtures()
+
+    benchmarks: Dict[str, Callable[[], Any]] = {}
+    for fixture_name, payload in data.items():
+        for stage, fn in stages_for(payload).items():
+            benchmarks[f"{fixture_name}/{stage}"] = fn
+    benchmarks["commands/check_show_command_x1000"] = command_checks(1000 // len(SHOW_COMMANDS) + 1)
+
+    results: Dict[str, Any] = {}
+    print(f"{'benchmark':<48} {'median ms':>11} {'min ms':>11} {'peak KiB':>11}")
+    for name, fn in benchmarks.items():
+        if args.only and args.only not in name:
+            continue
+        stats = results[name] = measure(fn, args.repeat)
+        print(f"{name:<48} {stats['median_ms']:>11.2f} {stats['min_ms']:>11.2f} {stats['peak_kib']:>11.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# toon_encode.py — compare in-process TOON encoding with the npx CLI
+#
+#   python3 benchmarks/toon_encode.py            # in-process only
+#   python3 benchmarks/toon_encode.py --npx      # also time npx @toon-format/cli
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVERS_DIR)
+os.environ.setdefault("PYATS_TESTBED_PATH", os.path.join(SERVERS_DIR, "testbed.yaml"))
+
+import server  # noqa: E402
+from fixtures import interface_brief, route_table  # noqa: E402
+
+
+def time_it(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def report(label: str, size: int, samples: list) -> None:
+    print(
+        f"{label:<28} {size / 1024:>10.1f} KiB  "
+        f"min {min(samples) * 1000:>9.2f} ms  "
+        f"median {statistics.median(samples) * 1000:>9.2f} ms  (n={len(samples)})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time TOON encoding backends")
+    parser.add_argument("--npx", action="store_true", help="also time the npx CLI fallback")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = {
+        "small (12 interfaces)": interface_brief(12),
+        "medium (2k routes)": route_table(2_000),
+        "large (20k routes)": route_table(20_000),
+    }
+
+    for label, data in payloads.items():
+        safe = server.make_json_safe(data)
+        json_str = json.dumps(safe, indent=2)
+        size = len(json_str.encode())
+
+        if server.toon_encode is not None:
+            report(f"python  {label}", size, time_it(lambda: server.toon_encode(safe), args.repeat))
+        else:
+            print("toon-format is not installed; skipping in-process timings")
+
+        if args.npx:
+            report(
+                f"npx     {label}", size,
+                time_it(lambda: server._toon_encode_npx(json_str), max(1, args.repeat // 2)),
+            )
+
+
+if __name__ == "__main__":
+    main()
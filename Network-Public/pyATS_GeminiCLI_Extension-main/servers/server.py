@@ -1,25 +1,47 @@
 #!/usr/bin/env python3
 # pyats_fastmcp_server.py
 
+import time
+_PROCESS_T0 = time.perf_counter()
+
 import os
 import re
+import shlex
 import string
 import sys
 import json
+import hashlib
+import ipaddress
+import statistics
+import queue
+import sqlite3
+import zlib
+import random
+import fnmatch
+import importlib
+from collections import OrderedDict
+import atexit
+import signal
 import logging
 import textwrap
 import tempfile
+import threading
 import subprocess
-from typing import Any, Dict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-from pyats.topology import loader
-from genie.libs.parser.utils import get_parser
 from dotenv import load_dotenv
 import asyncio
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
+_MCP_T0 = time.perf_counter()
 from mcp.server.fastmcp import FastMCP
-import tiktoken
+_MCP_IMPORT_MS = (time.perf_counter() - _MCP_T0) * 1000
+
+# pyATS, Genie and tiktoken are imported lazily (see STARTUP below) so the
+# MCP handshake is answered before they finish loading.
 
 
 # ================================================================
@@ -34,11 +56,201 @@ logger = logging.getLogger("PyATSFastMCPServer")
 logger.setLevel(logging.INFO)   # <── FORCE INFO LOGS TO APPEAR
 
 
+# ================================================================
+# STARTUP — LAZY IMPORTS + TIMINGS
+# ================================================================
+_STARTUP_TIMINGS: Dict[str, float] = {"import mcp": _MCP_IMPORT_MS}
+_lazy_modules: Dict[str, Any] = {}
+
+
+def _lazy_import(name: str):
+    """
+    Import a heavy module on first use and record how long it took.
+    importlib serializes concurrent first imports of the same module, so a
+    request arriving mid warm-up simply waits for it.
+    """
+    module = _lazy_modules.get(name)
+    if module is None:
+        t0 = time.perf_counter()
+        module = importlib.import_module(name)
+        _STARTUP_TIMINGS.setdefault(f"import {name}", (time.perf_counter() - t0) * 1000)
+        _lazy_modules[name] = module
+    return module
+
+
+def _timed(stage: str, fn, *args):
+    t0 = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        _STARTUP_TIMINGS[stage] = (time.perf_counter() - t0) * 1000
+
+
+# ================================================================
+# METRICS
+# ================================================================
+# Upper bounds in seconds; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = 0
+        while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.total += seconds
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return min(LATENCY_BUCKETS[i], self.max) if i < len(LATENCY_BUCKETS) else self.max
+        return self.max
+
+
+class Metrics:
+    """
+    In-process latency histograms, counters and gauges, keyed by metric
+    name plus labels (e.g. stage, device). Exposed through the
+    pyats_server_stats tool and, optionally, as a Prometheus text file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Any, _Histogram] = {}
+        self._counters: Dict[Any, float] = {}
+        self._gauges: Dict[Any, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]):
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(seconds)
+
+    def inc(self, name: str, n: float = 1, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def gauge_add(self, name: str, delta: float, **labels) -> None:
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + delta
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    @staticmethod
+    def _label_text(labels) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Nested {metric: {label values: value}} view for the stats tool."""
+        def nest(items, render):
+            out: Dict[str, Dict[str, Any]] = {}
+            for (name, labels), value in sorted(items):
+                label = ",".join(v for _, v in labels) or "total"
+                out.setdefault(name, {})[label] = render(value)
+            return out
+
+        with self._lock:
+            return {
+                "latency": nest(self._histograms.items(), lambda h: {
+                    "count": h.count,
+                    "avg_ms": round(1000 * h.total / h.count, 1) if h.count else 0,
+                    "p50_ms": round(1000 * h.quantile(0.5), 1),
+                    "p95_ms": round(1000 * h.quantile(0.95), 1),
+                    "max_ms": round(1000 * h.max, 1),
+                }),
+                "counters": nest(self._counters.items(), lambda v: v),
+                "gauges": nest(self._gauges.items(), lambda v: v),
+            }
+
+    def prometheus(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, n in zip(list(LATENCY_BUCKETS) + ["+Inf"], h.counts):
+                    cumulative += n
+                    le = labels + (("le", str(bound)),)
+                    lines.append(f"{name}_bucket{self._label_text(le)} {cumulative}")
+                lines.append(f"{name}_sum{self._label_text(labels)} {h.total:.6f}")
+                lines.append(f"{name}_count{self._label_text(labels)} {h.count}")
+            for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+                for (name, labels), value in sorted(values.items()):
+                    if name not in seen:
+                        lines.append(f"# TYPE {name} {kind}")
+                        seen.add(name)
+                    lines.append(f"{name}{self._label_text(labels)} {value}")
+        for name, value in sorted((extra_gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = Metrics()
+
+
 # ================================================================
 # ENV + TESTBED
 # ================================================================
 load_dotenv()
 
+
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={raw!r}, using {default}")
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={raw!r}, using {default}")
+        return default
+
+
 TESTBED_PATH = os.getenv("PYATS_TESTBED_PATH")
 if not TESTBED_PATH or not os.path.exists(TESTBED_PATH):
     logger.critical(f"❌ CRITICAL: PYATS_TESTBED_PATH missing or invalid: {TESTBED_PATH}")
@@ -47,107 +259,539 @@ if not TESTBED_PATH or not os.path.exists(TESTBED_PATH):
 logger.info(f"✅ Using testbed file: {TESTBED_PATH}")
 
 
+class TestbedCache:
+    """
+    Loads the testbed once and re-parses it only when the file changes
+    (mtime first, then content hash, so a `touch` does not reload).
+
+    Device objects whose YAML entry did not change are carried over from
+    the previous load, which keeps pooled sessions to those devices open
+    when an unrelated device entry is edited. Editing any section other
+    than `devices:` replaces every Device.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime_ns: Optional[int] = None
+        self._digest: Optional[str] = None
+        self._testbed = None
+        self._devices: Dict[str, Any] = {}
+        self._raw_devices: Dict[str, Dict[str, Any]] = {}
+        self._device_digests: Dict[str, str] = {}
+
+    def refresh(self) -> None:
+        with self._lock:
+            try:
+                self._refresh_locked()
+            except Exception as e:
+                if self._testbed is None:
+                    raise
+                logger.error(f"Testbed reload failed, keeping previous version: {e}")
+
+    def _refresh_locked(self) -> None:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        if self._testbed is not None and mtime_ns == self._mtime_ns:
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == self._digest:
+            self._mtime_ns = mtime_ns
+            return
+
+        try:
+            loader = _lazy_import("pyats.topology.loader")
+            testbed = loader.load(self.path)
+            raw = _lazy_import("yaml").safe_load(data) or {}
+            raw_devices = raw.get("devices") or {}
+        except Exception:
+            if self._testbed is not None:
+                # Don't re-parse a broken file on every call; wait for the next edit.
+                self._mtime_ns, self._digest = mtime_ns, digest
+            raise
+
+        devices: Dict[str, Any] = {}
+        device_digests: Dict[str, str] = {}
+        kept = 0
+        # testbed: (shared credentials, servers) and topology: feed into every
+        # Device, so a change there invalidates all of them.
+        shared = {k: v for k, v in raw.items() if k != "devices"}
+        for name, device in testbed.devices.items():
+            entry = json.dumps([shared, raw_devices.get(name)], sort_keys=True, default=str)
+            device_digest = hashlib.sha256(entry.encode()).hexdigest()
+            device_digests[name] = device_digest
+            if self._device_digests.get(name) == device_digest and name in self._devices:
+                devices[name] = self._devices[name]
+                kept += 1
+            else:
+                devices[name] = device
+
+        reloaded = self._testbed is not None
+        self._testbed = testbed
+        self._devices = devices
+        self._raw_devices = raw_devices
+        self._device_digests = device_digests
+        self._digest = digest
+        self._mtime_ns = mtime_ns
+
+        if reloaded:
+            logger.info(
+                f"🔄 Testbed reloaded: {len(devices)} devices, {kept} unchanged"
+            )
+        else:
+            logger.info(f"📚 Testbed loaded: {len(devices)} devices")
+
+    def stale(self) -> bool:
+        """
+        True if refresh() may have work to do. Lock-free, so event-loop
+        code can check it and only hand real reloads to a thread.
+        """
+        if self._testbed is None:
+            return True
+        try:
+            return os.stat(self.path).st_mtime_ns != self._mtime_ns
+        except OSError:
+            return True
+
+    def device(self, device_name: str, refresh: bool = True):
+        if refresh:
+            self.refresh()
+        device = self._devices.get(device_name)
+        if not device:
+            raise ValueError(f"Device '{device_name}' not in testbed")
+        return device
+
+    def devices(self) -> Dict[str, Any]:
+        self.refresh()
+        return dict(self._devices)
+
+    def raw_device(self, device_name: str, refresh: bool = True) -> Dict[str, Any]:
+        if refresh:
+            self.refresh()
+        return self._raw_devices.get(device_name) or {}
+
+
+_TESTBED = TestbedCache(TESTBED_PATH)
+
+
 # ================================================================
 # TOKENIZER (optional but great)
 # ================================================================
-try:
-    tokenizer = tiktoken.get_encoding("o200k_base")
-    logger.info("🧮 Loaded GPT o200k_base tokenizer for token savings reporting")
-except Exception:
-    tokenizer = None
+# off     -> no token footer at all
+# sampled -> exact for small outputs, extrapolated from evenly spaced
+#            windows of TOKEN_SAMPLE_CHARS characters for large ones
+# exact   -> tokenize everything
+TOKEN_STATS_MODE = os.getenv("PYATS_TOKEN_STATS", "sampled").strip().lower()
+if TOKEN_STATS_MODE not in ("off", "sampled", "exact"):
+    logger.warning(f"Unknown PYATS_TOKEN_STATS={TOKEN_STATS_MODE!r}, using 'sampled'")
+    TOKEN_STATS_MODE = "sampled"
+TOKEN_SAMPLE_CHARS = _env_int("PYATS_TOKEN_SAMPLE_CHARS", 64 * 1024)
+TOKEN_SAMPLE_WINDOWS = 8
+TOKEN_CACHE_SIZE = 1024
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+_token_cache: "OrderedDict[Any, int]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    """Load the o200k tokenizer on first use (tiktoken import + BPE load are slow)."""
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            try:
+                import tiktoken
+                _tokenizer = tiktoken.get_encoding("o200k_base")
+                logger.info("🧮 Loaded GPT o200k_base tokenizer for token savings reporting")
+            except Exception as e:
+                logger.warning(f"Tokenizer unavailable, token savings disabled: {e}")
+                _tokenizer = None
+            _tokenizer_loaded = True
+    return _tokenizer
 
 
 def count_tokens(text: str) -> int:
+    """Exact token count, cached by content hash; -1 if unavailable."""
+    tokenizer = _get_tokenizer()
     if tokenizer is None:
         return -1
+
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            _token_cache.move_to_end(key)
+            return cached
+
     try:
-        return len(tokenizer.encode(text))
+        count = len(tokenizer.encode(text, disallowed_special=()))
     except Exception:
         return -1
 
+    with _token_cache_lock:
+        _token_cache[key] = count
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return count
+
+
+def estimate_tokens(text: str) -> Tuple[int, bool]:
+    """Return (token count, exact?) according to PYATS_TOKEN_STATS."""
+    if TOKEN_STATS_MODE == "exact" or len(text) <= TOKEN_SAMPLE_CHARS:
+        return count_tokens(text), True
+
+    window = TOKEN_SAMPLE_CHARS // TOKEN_SAMPLE_WINDOWS
+    stride = len(text) // TOKEN_SAMPLE_WINDOWS
+    sample = "".join(text[i * stride:i * stride + window] for i in range(TOKEN_SAMPLE_WINDOWS))
+    sampled = count_tokens(sample)
+    if sampled <= 0:
+        return -1, False
+    return round(sampled * len(text) / len(sample)), False
+
+
+def token_savings_text(json_str: str, toon_str: str) -> str:
+    if TOKEN_STATS_MODE == "off":
+        return ""
+
+    json_tokens, json_exact = estimate_tokens(json_str)
+    toon_tokens, toon_exact = estimate_tokens(toon_str)
+
+    if json_tokens > 0 and toon_tokens > 0:
+        reduction = 100 * (1 - (toon_tokens / json_tokens))
+        approx = "" if json_exact and toon_exact else "~"
+        return (
+            f"\n\n# Token Savings\n"
+            f"- JSON tokens: {approx}{json_tokens}\n"
+            f"- TOON tokens: {approx}{toon_tokens}\n"
+            f"- Saved: {approx}{reduction:.1f}%\n"
+        )
+    return "\n\n# Token Savings\n(unavailable)\n"
+
 
 # ================================================================
 # SAFE JSON NORMALIZATION
 # ================================================================
-def make_json_safe(obj: Any) -> Any:
+_SCALAR, _DICT, _LIST, _SET, _OBJECT, _OTHER = range(6)
+
+
+def _json_kind(obj: Any) -> int:
+    t = type(obj)
+    if t is str or t is int or t is float or t is bool or obj is None:
+        return _SCALAR
     if isinstance(obj, dict):
-        return {str(k): make_json_safe(v) for k, v in obj.items()}
+        return _DICT
     if isinstance(obj, (list, tuple)):
-        return [make_json_safe(v) for v in obj]
+        return _LIST
     if isinstance(obj, set):
-        return sorted([make_json_safe(v) for v in obj], key=lambda x: str(x))
+        return _SET
     if hasattr(obj, "__dict__"):
-        return make_json_safe(obj.__dict__)
-    try:
-        json.dumps(obj)
+        # Classes expose a mappingproxy, which is stringified like any other leaf.
+        return _OBJECT if isinstance(obj.__dict__, dict) else _OTHER
+    if isinstance(obj, (str, int, float, bool)):
+        return _SCALAR
+    return _OTHER
+
+
+def _json_leaf_str(obj: Any) -> str:
+    return str(obj.__dict__) if hasattr(obj, "__dict__") else str(obj)
+
+
+class _JsonFrame:
+    """One container being normalized by make_json_safe()."""
+
+    __slots__ = ("src", "kind", "items", "out", "count", "key")
+
+    def __init__(self, src: Any, kind: int, key: Any):
+        self.src = src
+        self.kind = kind
+        self.key = key
+        self.count = 0
+        if kind == _OBJECT:
+            self.items = iter(vars(src).items())
+            self.out = {}
+        elif kind == _DICT:
+            self.items = iter(src.items())
+            self.out = None if type(src) is dict else {}
+        elif kind == _LIST:
+            self.items = enumerate(src)
+            self.out = None if type(src) is list else []
+        else:  # _SET
+            self.items = enumerate(src)
+            self.out = []
+
+    def add(self, key: Any, child: Any, value: Any) -> None:
+        if self.kind == _LIST or self.kind == _SET:
+            if self.out is None:
+                if value is child:
+                    self.count += 1
+                    return
+                self.out = list(self.src[:self.count])
+            self.out.append(value)
+            return
+
+        new_key = key if type(key) is str else str(key)
+        if self.out is None:
+            if value is child and new_key is key:
+                self.count += 1
+                return
+            self.out = {}
+            for i, (k, v) in enumerate(self.src.items()):
+                if i == self.count:
+                    break
+                self.out[k] = v
+        self.out[new_key] = value
+
+    def finish(self) -> Any:
+        if self.out is None:
+            return self.src
+        if self.kind == _SET:
+            return sorted(self.out, key=str)
+        return self.out
+
+
+def make_json_safe(obj: Any) -> Any:
+    """
+    Normalize a pyATS/Genie result into something json.dumps() accepts.
+
+    Iterative (no recursion limit on deep structures), no trial
+    serialization per leaf, and subtrees that are already plain
+    dict/list/str/int/float/bool/None are returned as the same objects.
+    Keys become strings, tuples become lists, sets become sorted lists,
+    objects become their __dict__, anything else becomes str(). A
+    reference back to an ancestor is replaced by "<cycle: TypeName>".
+    """
+    kind = _json_kind(obj)
+    if kind == _SCALAR:
         return obj
-    except Exception:
-        return str(obj)
+    if kind == _OTHER:
+        return _json_leaf_str(obj)
 
+    memo: Dict[int, Any] = {}
+    active = {id(obj)}
+    stack = [_JsonFrame(obj, kind, None)]
 
-# ================================================================
-# TOON CONVERSION (via npx)
-# ================================================================
-def toon_with_stats(data: Any) -> str:
+    while True:
+        frame = stack[-1]
+        descended = False
+        for key, child in frame.items:
+            child_kind = _json_kind(child)
+            if child_kind == _SCALAR:
+                value = child
+            elif child_kind == _OTHER:
+                value = _json_leaf_str(child)
+            else:
+                child_id = id(child)
+                if child_id in active:
+                    value = f"<cycle: {type(child).__name__}>"
+                elif child_id in memo:
+                    value = memo[child_id]
+                else:
+                    active.add(child_id)
+                    stack.append(_JsonFrame(child, child_kind, key))
+                    descended = True
+                    break
+            frame.add(key, child, value)
+
+        if descended:
+            continue
+
+        stack.pop()
+        active.discard(id(frame.src))
+        result = frame.finish()
+        memo[id(frame.src)] = result
+        if not stack:
+            return result
+        stack[-1].add(frame.key, frame.src, result)
+
+
+_JSON_END = object()
+_JSON_CHUNK_PIECES = 4096
+
+
+def _json_float(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "Infinity" if value > 0 else "-Infinity"
+    return float.__repr__(value)
+
+
+def _json_scalar(value: Any, encode_str) -> str:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if isinstance(value, str):
+        return encode_str(value)
+    if isinstance(value, int):
+        return int.__repr__(value)
+    return _json_float(value)
+
+
+def _json_members(node: Any, kind: int, sort_keys: bool) -> tuple:
+    """(is_dict, iterator over the items / (key, value) pairs) of a container."""
+    if kind == _LIST:
+        return False, iter(node)
+    items = vars(node).items() if kind == _OBJECT else node.items()
+    if kind == _DICT and any(type(key) is not str for key in node):
+        items = {(k if type(k) is str else str(k)): v for k, v in items}.items()
+    if sort_keys:
+        items = sorted(items, key=lambda kv: kv[0])
+    return True, iter(items)
+
+
+def iter_json_safe(
+    obj: Any,
+    sort_keys: bool = False,
+    separators: tuple = (", ", ": "),
+    ensure_ascii: bool = True,
+) -> Any:
     """
-    Take any Python object (result dicts from pyATS helpers),
-    normalize to JSON, run TOON, and append token savings stats.
+    Yield the JSON text of make_json_safe(obj) in chunks, without building
+    the normalized tree or the full string. Same normalization rules as
+    make_json_safe(); the output equals json.dumps(make_json_safe(obj), ...)
+    with the same keyword arguments.
     """
-    safe = make_json_safe(data)
-    json_str = json.dumps(safe, indent=2)
+    item_sep, key_sep = separators
+    encode_str = json.encoder.encode_basestring_ascii if ensure_ascii else json.encoder.encode_basestring
+    out: List[str] = []
+    stack: List[list] = []   # [iterator, is_dict, id, wrote_first_item]
+    active = set()
+
+    def emit(value: Any) -> None:
+        kind = _json_kind(value)
+        if kind == _SCALAR:
+            out.append(_json_scalar(value, encode_str))
+            return
+        if kind == _OTHER:
+            out.append(encode_str(_json_leaf_str(value)))
+            return
+        if kind == _SET:
+            # Sets are sorted by their normalized values, so convert them whole.
+            value, kind = make_json_safe(value), _LIST
+        value_id = id(value)
+        if value_id in active:
+            out.append(encode_str(f"<cycle: {type(value).__name__}>"))
+            return
+        active.add(value_id)
+        is_dict, members = _json_members(value, kind, sort_keys)
+        out.append("{" if is_dict else "[")
+        stack.append([members, is_dict, value_id, False])
+
+    emit(obj)
+    while stack:
+        frame = stack[-1]
+        item = next(frame[0], _JSON_END)
+        if item is _JSON_END:
+            stack.pop()
+            active.discard(frame[2])
+            out.append("}" if frame[1] else "]")
+            continue
+        if frame[3]:
+            out.append(item_sep)
+        frame[3] = True
+        if frame[1]:
+            key, item = item
+            out.append(encode_str(key))
+            out.append(key_sep)
+        emit(item)
+        if len(out) >= _JSON_CHUNK_PIECES:
+            yield "".join(out)
+            out.clear()
+    if out:
+        yield "".join(out)
+
+
+def dump_json_safe(obj: Any, fp, **kwargs) -> None:
+    """Normalize `obj` and write it as JSON to the file-like `fp`, chunk by chunk."""
+    for chunk in iter_json_safe(obj, **kwargs):
+        fp.write(chunk)
+
+
+# ================================================================
+# TOON CONVERSION (in-process, npx fallback)
+# ================================================================
+# auto   -> in-process toon-format, fall back to npx if it is missing or fails
+# python -> in-process only
+# npx    -> always shell out to `npx @toon-format/cli` (previous behaviour)
+TOON_BACKEND = os.getenv("PYATS_TOON_BACKEND", "auto").strip().lower()
+
+try:
+    from toon_format import encode as toon_encode
+except ImportError:
+    toon_encode = None
+    if TOON_BACKEND != "npx":
+        logger.warning("toon-format not installed; TOON encoding will use npx")
 
-    # ------------------------------------------------------------------
-    # Run TOON CLI via NPX
-    # ------------------------------------------------------------------
-    try:
-        with tempfile.NamedTemporaryFile(mode="w+", suffix=".json", delete=False) as f_json:
-            f_json.write(json_str)
-            f_json.flush()
-            src = f_json.name
-            dst = f_json.name + ".toon"
+
+def _toon_encode_npx(json_str: str) -> str:
+    with tempfile.TemporaryDirectory(prefix="pyats-toon-") as tmp:
+        src = os.path.join(tmp, "data.json")
+        dst = os.path.join(tmp, "data.toon")
+        with open(src, "w") as f:
+            f.write(json_str)
 
         cmd = ["npx", "@toon-format/cli", src, "-o", dst]
         logger.info(f"[TOON] Running: {' '.join(cmd)}")
-
         result = subprocess.run(cmd, capture_output=True, text=True)
-
         if result.returncode != 0:
-            return (
-                "```error\n"
-                f"TOON CLI failed:\n{result.stderr}\n\n"
-                "JSON OUTPUT:\n"
-                f"{json_str}\n"
-                "```"
-            )
+            raise RuntimeError(f"TOON CLI failed:\n{result.stderr}")
 
         with open(dst, "r") as f:
-            toon_str = f.read()
+            return f.read()
+
+
+def encode_toon(safe: Any, json_str: str) -> str:
+    """Encode already JSON-safe data as TOON using the configured backend."""
+    if TOON_BACKEND != "npx":
+        if toon_encode is None:
+            if TOON_BACKEND == "python":
+                raise RuntimeError("PYATS_TOON_BACKEND=python but toon-format is not installed")
+        else:
+            try:
+                return toon_encode(safe)
+            except Exception as e:
+                if TOON_BACKEND == "python":
+                    raise
+                logger.warning(f"[TOON] In-process encode failed, falling back to npx: {e}")
+    return _toon_encode_npx(json_str)
+
+
+def toon_with_stats(data: Any) -> str:
+    """
+    Take any Python object (result dicts from pyATS helpers),
+    normalize to JSON, encode as TOON, and append token savings stats.
+    """
+    with _METRICS.timer("pyats_stage_seconds", stage="normalize"):
+        safe = make_json_safe(data)
+        json_str = json.dumps(safe, indent=2)
 
+    try:
+        with _METRICS.timer("pyats_stage_seconds", stage="toon_encode"):
+            toon_str = encode_toon(safe, json_str)
     except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="toon_encode")
         return (
             "```error\n"
-            f"TOON subprocess error:\n{e}\n\n"
+            f"TOON encoding failed:\n{e}\n\n"
             "JSON OUTPUT:\n"
             f"{json_str}\n"
             "```"
         )
 
     # ------------------------------------------------------------------
-    # Token savings (FORCED INTO TOOL OUTPUT)
+    # Token savings (FORCED INTO TOOL OUTPUT unless PYATS_TOKEN_STATS=off)
     # ------------------------------------------------------------------
-    json_tokens = count_tokens(json_str)
-    toon_tokens = count_tokens(toon_str)
-
-    if json_tokens > 0 and toon_tokens > 0:
-        reduction = 100 * (1 - (toon_tokens / json_tokens))
-        savings_text = (
-            f"\n\n# Token Savings\n"
-            f"- JSON tokens: {json_tokens}\n"
-            f"- TOON tokens: {toon_tokens}\n"
-            f"- Saved: {reduction:.1f}%\n"
-        )
-    else:
-        savings_text = "\n\n# Token Savings\n(unavailable)\n"
+    with _METRICS.timer("pyats_stage_seconds", stage="tokenize"):
+        savings_text = token_savings_text(json_str, toon_str)
 
     # ------------------------------------------------------------------
     # Return TOON + savings info bundled together
@@ -155,30 +799,259 @@ def toon_with_stats(data: Any) -> str:
     return f"```toon\n{toon_str}\n```{savings_text}"
 
 
+async def render_result(data: Any, paginate: bool = True) -> str:
+    """
+    Run toon_with_stats() in a worker thread so encoding and tokenizing stay
+    off the event loop. Results larger than PAGE_THRESHOLD_BYTES are stored
+    under a handle and only their first page is rendered.
+    """
+    if paginate:
+        return await asyncio.to_thread(lambda: toon_with_stats(_RESULT_HANDLES.first_page(data)))
+    return await asyncio.to_thread(toon_with_stats, data)
+
+
 # ================================================================
-# PYATS DEVICE HELPERS
+# LARGE RESULT HANDLES
 # ================================================================
-def _get_device(device_name: str):
-    try:
-        testbed = loader.load(TESTBED_PATH)
-        device = testbed.devices.get(device_name)
-        if not device:
-            raise ValueError(f"Device '{device_name}' not in testbed")
+PAGE_THRESHOLD_BYTES = _env_int("PYATS_PAGE_THRESHOLD_BYTES", 128 * 1024)
+PAGE_TARGET_BYTES = _env_int("PYATS_PAGE_TARGET_BYTES", 48 * 1024)
+HANDLE_TTL = _env_float("PYATS_HANDLE_TTL", 900.0)
+HANDLE_MEMORY_BYTES = _env_int("PYATS_HANDLE_MEMORY_MB", 256) * 1024 * 1024
 
-        if not device.is_connected():
-            logger.info(f"🔌 Connecting to {device_name}…")
-            device.connect(
-                connection_timeout=120,
-                learn_hostname=True,
-                log_stdout=False,
-                mit=True,
-            )
-            logger.info(f"✅ Connected to {device_name}")
 
-        return device
+def _approx_sizes(obj: Any, sizes: Dict[int, int], limit: Optional[int] = None) -> int:
+    """
+    Rough JSON size of `obj` in bytes, remembering the size of every
+    container and every multi-line or long string in `sizes` (keyed by
+    id). With `limit`
+    the walk stops as soon as the total is known to exceed it.
+    """
+    total = 0
+    stack = [(obj, False)]
+    pending: List[tuple] = []   # (container id, total before its children)
+    active = set()
+
+    while stack:
+        node, done = stack.pop()
+        if done:
+            node_id, before = pending.pop()
+            sizes[node_id] = total - before
+            active.discard(node_id)
+            continue
+        if isinstance(node, str):
+            total += len(node) + 2
+            if "\n" in node or len(node) > PAGE_TARGET_BYTES:
+                sizes[id(node)] = len(node) + 2
+        elif isinstance(node, (dict, list, tuple)):
+            node_id = id(node)
+            if node_id in sizes or node_id in active:
+                total += sizes.get(node_id, 8)
+                continue
+            active.add(node_id)
+            pending.append((node_id, total))
+            stack.append((node, True))
+            if isinstance(node, dict):
+                total += 2
+                for key, value in node.items():
+                    total += len(str(key)) + 6
+                    stack.append((value, False))
+            else:
+                total += 2 + len(node)
+                stack.extend((value, False) for value in node)
+        else:
+            total += 8
+        if limit is not None and total > limit:
+            return total
+    return total
+
+
+def _page_target(root: Any, sizes: Dict[int, int]) -> tuple:
+    """
+    Find the collection to page over: follow the child that holds most of
+    the data until no single child does, or a large string is reached.
+    Returns (path, node).
+    """
+    path: List[Any] = []
+    node = root
+    while isinstance(node, (dict, list, tuple)):
+        children = list(node.items()) if isinstance(node, dict) else list(enumerate(node))
+        if not children:
+            break
+        key, child = max(children, key=lambda kv: sizes.get(id(kv[1]), 0))
+        if sizes.get(id(child), 0) * 2 < sizes.get(id(node), 0):
+            break
+        path.append(key)
+        node = child
+    return path, node
+
+
+def _replace_at(root: Any, path: List[Any], value: Any) -> Any:
+    """Copy the containers along `path` and put `value` at its end."""
+    if not path:
+        return value
+    head, rest = path[0], path[1:]
+    copy = dict(root) if isinstance(root, dict) else list(root)
+    copy[head] = _replace_at(root[head], rest, value)
+    return copy
+
+
+class ResultHandles:
+    """
+    Large results kept on the server so they can be read page by page.
+
+    Entries expire HANDLE_TTL seconds after their last access, and the
+    least recently used ones are dropped when their (approximate) total
+    size exceeds HANDLE_MEMORY_BYTES.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
 
+    def first_page(self, data: Any) -> Any:
+        """Return `data` unchanged, or the first page of it if it is large."""
+        sizes: Dict[int, int] = {}
+        if not isinstance(data, dict) or _approx_sizes(data, sizes, PAGE_THRESHOLD_BYTES) <= PAGE_THRESHOLD_BYTES:
+            return data
+
+        with _METRICS.timer("pyats_stage_seconds", stage="paginate"):
+            sizes.clear()
+            size = _approx_sizes(data, sizes)
+            path, node = _page_target(data, sizes)
+            if isinstance(node, str):
+                lines = node.splitlines()
+                if len(lines) > 1 and max(map(len, lines)) <= PAGE_TARGET_BYTES:
+                    kind, items = "lines", lines
+                else:
+                    # One huge line (e.g. a blob with no line breaks):
+                    # page by fixed-size character ranges instead.
+                    kind, items = "chars", node
+            elif isinstance(node, dict):
+                kind, items = "keys", list(node)
+            elif isinstance(node, (list, tuple)):
+                kind, items = "items", node
+            else:
+                return data
+            if len(items) < 2:
+                return data
+
+            node_size = sizes.get(id(node), size)
+            page_size = max(1, int(len(items) * PAGE_TARGET_BYTES / max(node_size, 1)))
+            handle = f"h-{os.urandom(6).hex()}"
+            self._store(handle, {
+                "data": data,
+                "path": path,
+                "kind": kind,
+                "items": items,
+                "page_size": page_size,
+                "bytes": size,
+                "created": time.time(),
+                "accessed": time.monotonic(),
+            })
+        logger.info(f"📦 Stored {size // 1024} KiB result as {handle} ({len(items)} {kind})")
+        return self.page(handle, 0, page_size)
+
+    def page(self, handle: str, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_locked()
+            entry = self._entries.get(handle)
+            if entry is None:
+                return {"status": "error", "error": f"Unknown or expired handle '{handle}'"}
+            self._entries.move_to_end(handle)
+            entry["accessed"] = time.monotonic()
+
+        items, kind = entry["items"], entry["kind"]
+        offset = max(0, offset)
+        limit = max(1, limit or entry["page_size"])
+        chunk = items[offset:offset + limit]
+        node = entry["data"]
+        for key in entry["path"]:
+            node = node[key]
+        if kind == "lines":
+            value = "\n".join(chunk)
+        elif kind == "chars":
+            value = chunk
+        elif kind == "keys":
+            value = {key: node[key] for key in chunk}
+        else:
+            value = list(chunk)
+
+        result = _replace_at(entry["data"], entry["path"], value)
+        end = offset + len(chunk)
+        result["page"] = {
+            "handle": handle,
+            "path": ".".join(str(p) for p in entry["path"]) or "(root)",
+            "unit": kind,
+            "offset": offset,
+            "limit": limit,
+            "returned": len(chunk),
+            "total": len(items),
+            "next_offset": end if end < len(items) else None,
+        }
+        return result
+
+    def _store(self, handle: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._expire_locked()
+            self._entries[handle] = entry
+            self._bytes += entry["bytes"]
+            while self._bytes > HANDLE_MEMORY_BYTES and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= old["bytes"]
+                self.evictions += 1
+
+    def _expire_locked(self) -> None:
+        deadline = time.monotonic() - HANDLE_TTL
+        for handle in [h for h, e in self._entries.items() if e["accessed"] < deadline]:
+            self._bytes -= self._entries.pop(handle)["bytes"]
+
+    def release(self, handle: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(handle, None)
+            if entry:
+                self._bytes -= entry["bytes"]
+            return entry is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire_locked()
+            return {
+                "handles": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+            }
+
+
+_RESULT_HANDLES = ResultHandles()
+
+
+# ================================================================
+# PYATS DEVICE HELPERS
+# ================================================================
+def _lookup_device(device_name: str):
+    return _TESTBED.device(device_name)
+
+
+def _connect_device(device) -> None:
+    try:
+        logger.info(f"🔌 Connecting to {device.name}…")
+        with _METRICS.timer("pyats_stage_seconds", stage="connect"):
+            if device.os == "linux":
+                device.connect()
+            else:
+                device.connect(
+                    connection_timeout=120,
+                    learn_hostname=True,
+                    log_stdout=False,
+                    mit=True,
+                )
+        _METRICS.inc("pyats_connections_total", result="new")
+        logger.info(f"✅ Connected to {device.name}")
     except Exception as e:
-        logger.error(f"Connection error for {device_name}: {e}", exc_info=True)
+        _METRICS.inc("pyats_errors_total", stage="connect")
+        logger.error(f"Connection error for {device.name}: {e}", exc_info=True)
         raise
 
 
@@ -191,338 +1064,3140 @@ def _disconnect_device(device):
             logger.warning(f"Disconnect error {device.name}: {e}")
 
 
-def clean_output(output: str) -> str:
-    ansi_escape = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
-    output = ansi_escape.sub("", output)
-    return "".join(c for c in output if c in string.printable)
-
-
 # ================================================================
-# CORE COMMAND RUNNERS
-# (merged / upgraded from your second script)
+# CONNECTION POOL
 # ================================================================
-async def run_show_command_async(device_name: str, command: str) -> Dict[str, Any]:
-    """Execute a show command on a device with safety checks."""
-    try:
-        disallowed_modifiers = [
-            "|", "include", "exclude", "begin", "redirect",
-            ">", "<", "config", "copy", "delete", "erase", "reload", "write"
-        ]
-        command_lower = command.lower().strip()
+POOL_MAX_SESSIONS = _env_int("PYATS_POOL_MAX_SESSIONS", 32)
+POOL_IDLE_TIMEOUT = _env_float("PYATS_POOL_IDLE_TIMEOUT", 300.0)
+POOL_HEALTHCHECK_AFTER = _env_float("PYATS_POOL_HEALTHCHECK_AFTER", 30.0)
+POOL_ACQUIRE_TIMEOUT = _env_float("PYATS_POOL_ACQUIRE_TIMEOUT", 180.0)
 
-        if not command_lower.startswith("show"):
-            return {"status": "error", "error": f"Command '{command}' is not a 'show' command."}
 
-        for part in command_lower.split():
-            if part in disallowed_modifiers:
-                return {
-                    "status": "error",
-                    "error": f"Command '{command}' contains disallowed term '{part}'."
-                }
+class SessionUnusable(RuntimeError):
+    """Raised by command helpers when a session's state can no longer be trusted."""
 
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_show_command, device_name, command)
-        )
-        return result
 
-    except Exception as e:
-        logger.error(f"Error in run_show_command_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Execution error: {e}"}
+# unicon errors that mean the session itself is gone or out of sync, as
+# opposed to a command the device rejected (SubCommandFailure on "% Invalid").
+_BROKEN_SESSION_ERRORS = (
+    "EOF", "TimeoutError", "StateMachineError", "SessionConnectionError", "ConnectionError",
+)
 
 
-def _execute_show_command(device_name: str, command: str) -> Dict[str, Any]:
-    """Synchronous helper for show command execution."""
-    device = None
+def _session_unhealthy(device, error: BaseException) -> bool:
+    """True when `error` (or its cause) means the session must be dropped."""
     try:
-        device = _get_device(device_name)
+        errors = _lazy_import("unicon.core.errors")
+        broken = tuple(getattr(errors, name) for name in _BROKEN_SESSION_ERRORS)
+    except Exception:
+        broken = ()
+    broken += (SessionUnusable, EOFError, ConnectionError, TimeoutError)
 
-        try:
-            logger.info(f"Attempting to parse command: '{command}' on {device_name}")
-            parsed_output = device.parse(command)
-            logger.info(f"Successfully parsed output for '{command}' on {device_name}")
-            return {"status": "completed", "device": device_name, "output": parsed_output}
-        except Exception as parse_exc:
-            logger.warning(
-                f"Parsing failed for '{command}' on {device_name}: {parse_exc}. Falling back to execute."
-            )
-            raw_output = device.execute(command)
-            logger.info(f"Executed command (fallback): '{command}' on {device_name}")
-            return {"status": "completed_raw", "device": device_name, "output": raw_output}
+    seen = set()
+    pending = [error]
+    while pending:
+        exc = pending.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        if isinstance(exc, broken):
+            return True
+        # SubCommandFailure carries the underlying error in its args.
+        pending.extend(a for a in getattr(exc, "args", ()) if isinstance(a, BaseException))
+        pending.extend((exc.__cause__, exc.__context__))
 
-    except Exception as e:
-        logger.error(f"Error executing show command: {e}", exc_info=True)
-        return {"status": "error", "error": f"Execution error: {e}"}
-    finally:
-        _disconnect_device(device)
+    try:
+        return device is None or not device.is_connected()
+    except Exception:
+        return True
 
 
-async def apply_device_configuration_async(device_name: str, config_commands: str) -> Dict[str, Any]:
-    """Apply configuration to a device (with basic safety checks)."""
-    try:
-        if "erase" in config_commands.lower() or "write erase" in config_commands.lower():
-            logger.warning(f"Rejected potentially dangerous command on {device_name}: {config_commands}")
-            return {
-                "status": "error",
-                "error": "Potentially dangerous command detected (erase). Operation aborted."
-            }
+class _PooledSession:
+    __slots__ = ("name", "device", "in_use", "last_used")
 
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_config, device_name, config_commands)
-        )
-        return result
+    def __init__(self, name: str):
+        self.name = name
+        self.device = None
+        self.in_use = False
+        self.last_used = time.monotonic()
 
+
+class ConnectionPool:
+    """
+    Keeps one live session per device name so tools stop paying a full
+    SSH handshake + login + enable + prompt learn on every call.
+
+    - A session is handed to one caller at a time; others wait for it.
+    - Sessions idle longer than `healthcheck_after` are probed before reuse.
+    - Sessions idle longer than `idle_timeout` are closed by a reaper thread.
+    - At most `max_sessions` sessions are open; the least recently used
+      idle session is closed to make room for a new device.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = POOL_MAX_SESSIONS,
+        idle_timeout: float = POOL_IDLE_TIMEOUT,
+        healthcheck_after: float = POOL_HEALTHCHECK_AFTER,
+        acquire_timeout: float = POOL_ACQUIRE_TIMEOUT,
+    ):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.healthcheck_after = healthcheck_after
+        self.acquire_timeout = acquire_timeout
+
+        self._sessions: Dict[str, _PooledSession] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stop = threading.Event()
+        self._counters = {"connects": 0, "reuses": 0, "health_failures": 0, "evictions": 0}
+
+        self._reaper = threading.Thread(
+            target=self._reap_loop, name="pyats-pool-reaper", daemon=True
+        )
+        self._reaper.start()
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+    def acquire(self, device_name: str):
+        deadline = time.monotonic() + self.acquire_timeout
+        victim = None
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is shut down")
+
+                session = self._sessions.get(device_name)
+                if session is not None:
+                    if not session.in_use:
+                        break
+                elif len(self._sessions) < self.max_sessions:
+                    session = self._sessions[device_name] = _PooledSession(device_name)
+                    break
+                else:
+                    victim = self._pop_lru_idle_locked()
+                    if victim is not None:
+                        session = self._sessions[device_name] = _PooledSession(device_name)
+                        break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"Timed out waiting for a session to {device_name} "
+                        f"({len(self._sessions)}/{self.max_sessions} sessions open)"
+                    )
+                self._cond.wait(remaining)
+
+            session.in_use = True
+
+        if victim is not None:
+            logger.info(f"♻️ Pool full, closing idle session to {victim.name}")
+            _disconnect_device(victim.device)
+
+        try:
+            return self._ensure_connected(session)
+        except Exception:
+            self.release(device_name, discard=True)
+            raise
+
+    def release(self, device_name: str, discard: bool = False) -> None:
+        device = None
+        with self._cond:
+            session = self._sessions.get(device_name)
+            if session is None:
+                return
+            session.in_use = False
+            session.last_used = time.monotonic()
+            if discard:
+                del self._sessions[device_name]
+                device = session.device
+            self._cond.notify_all()
+
+        if device is not None:
+            logger.info(f"🗑️ Discarding session to {device_name}")
+            _disconnect_device(device)
+
+    @contextmanager
+    def session(self, device_name: str):
+        """
+        Borrow a connected device. If the body raises, the session is
+        dropped only when it is no longer usable; a command the device
+        merely rejected keeps it in the pool.
+        """
+        device = self.acquire(device_name)
+        discard = False
+        try:
+            yield device
+        except BaseException as e:
+            discard = _session_unhealthy(device, e)
+            raise
+        finally:
+            self.release(device_name, discard=discard)
+
+    # ------------------------------------------------------------------
+    # Health
+    # ------------------------------------------------------------------
+    def _ensure_connected(self, session: _PooledSession):
+        device = _lookup_device(session.name)
+        if session.device is not None and session.device is not device:
+            logger.info(f"🔄 Testbed entry for {session.name} changed, dropping old session")
+            _disconnect_device(session.device)
+        session.device = device
+
+        if device.is_connected():
+            idle = time.monotonic() - session.last_used
+            if idle < self.healthcheck_after or self._probe(device):
+                self._count("reuses")
+                _METRICS.inc("pyats_connections_total", result="reused")
+                logger.info(f"♻️ Reusing session to {session.name}")
+                return device
+            self._count("health_failures")
+            logger.warning(f"Session to {session.name} failed health check, reconnecting")
+            _disconnect_device(device)
+
+        _connect_device(device)
+        self._count("connects")
+        return device
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._cond:
+            self._counters[key] += n
+
+    @staticmethod
+    def _probe(device) -> bool:
+        try:
+            device.execute("", timeout=10)
+            return True
+        except Exception as e:
+            logger.warning(f"Health check failed for {device.name}: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Eviction / shutdown
+    # ------------------------------------------------------------------
+    def _pop_lru_idle_locked(self) -> Optional[_PooledSession]:
+        idle = [s for s in self._sessions.values() if not s.in_use]
+        if not idle:
+            return None
+        victim = min(idle, key=lambda s: s.last_used)
+        del self._sessions[victim.name]
+        self._counters["evictions"] += 1
+        return victim
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while not self._stop.wait(interval):
+            self.evict_idle()
+
+    def evict_idle(self) -> int:
+        now = time.monotonic()
+        with self._cond:
+            expired = [
+                s for s in self._sessions.values()
+                if not s.in_use and now - s.last_used >= self.idle_timeout
+            ]
+            for s in expired:
+                del self._sessions[s.name]
+            self._counters["evictions"] += len(expired)
+            if expired:
+                self._cond.notify_all()
+
+        for s in expired:
+            logger.info(f"⏳ Closing idle session to {s.name}")
+            _disconnect_device(s.device)
+        return len(expired)
+
+    def close_all(self) -> None:
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._cond.notify_all()
+        self._stop.set()
+
+        for s in sessions:
+            _disconnect_device(s.device)
+        logger.info(f"🔒 Connection pool closed ({len(sessions)} sessions)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "open": len(self._sessions),
+                "in_use": sum(1 for s in self._sessions.values() if s.in_use),
+                "max_sessions": self.max_sessions,
+                **self._counters,
+            }
+
+
+_POOL = ConnectionPool()
+atexit.register(_POOL.close_all)
+
+
+# ================================================================
+# SCHEDULER
+# ================================================================
+SCHEDULER_MAX_WORKERS = _env_int("PYATS_MAX_WORKERS", 32)
+SCHEDULER_WAIT_WARN = _env_float("PYATS_QUEUE_WAIT_WARN", 5.0)
+
+
+class _DeviceLane:
+    __slots__ = ("lock", "queued", "running", "completed", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.queued = 0
+        self.running = False
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class DeviceScheduler:
+    """
+    Runs blocking device work on a dedicated, bounded thread pool instead
+    of the loop's shared default executor.
+
+    Each device has its own FIFO lane: work for one device runs one item
+    at a time, while different devices run in parallel up to `max_workers`.
+    If a caller is cancelled (e.g. a fan-out timeout) the lane stays busy
+    until the worker thread really finishes, so the next item never
+    overlaps it on the same session.
+    """
+
+    def __init__(self, max_workers: int = SCHEDULER_MAX_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="pyats-worker"
+        )
+        self._lanes: Dict[str, _DeviceLane] = {}
+        self._busy = 0
+
+    async def run(self, device_name: str, fn, *args, **kwargs):
+        lane = self._lanes.get(device_name)
+        if lane is None:
+            lane = self._lanes[device_name] = _DeviceLane()
+
+        enqueued = time.monotonic()
+        lane.queued += 1
+        _METRICS.gauge_add("pyats_inflight", 1, device=device_name)
+        try:
+            await lane.lock.acquire()
+        except BaseException:
+            _METRICS.gauge_add("pyats_inflight", -1, device=device_name)
+            raise
+        finally:
+            lane.queued -= 1
+
+        waited = time.monotonic() - enqueued
+        _METRICS.observe("pyats_stage_seconds", waited, stage="queue_wait")
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+        if waited >= SCHEDULER_WAIT_WARN:
+            logger.warning(
+                f"⏱️ {device_name} work waited {waited:.1f}s in queue "
+                f"({lane.queued} still queued, {self._busy}/{self.max_workers} workers busy)"
+            )
+
+        lane.running = True
+        self._busy += 1
+
+        def _done(_=None):
+            lane.running = False
+            lane.completed += 1
+            self._busy -= 1
+            _METRICS.gauge_add("pyats_inflight", -1, device=device_name)
+            lane.lock.release()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.done():
+                _done()
+            else:
+                future.add_done_callback(_done)
+            raise
+        except BaseException:
+            _done()
+            raise
+        _done()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        snapshot = list(self._lanes.items())
+        for name, lane in snapshot:
+            lanes[name] = {
+                "queued": lane.queued,
+                "running": lane.running,
+                "completed": lane.completed,
+                "avg_wait_ms": round(1000 * lane.total_wait / lane.completed) if lane.completed else 0,
+                "max_wait_ms": round(1000 * lane.max_wait),
+            }
+        return {
+            "max_workers": self.max_workers,
+            "busy_workers": self._busy,
+            "queued": sum(lane.queued for _, lane in snapshot),
+            "devices": lanes,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_SCHEDULER = DeviceScheduler()
+
+
+# ================================================================
+# RESULT CACHE
+# ================================================================
+CACHE_MAX_ENTRIES = _env_int("PYATS_CACHE_MAX_ENTRIES", 512)
+CACHE_DEFAULT_TTL = _env_float("PYATS_CACHE_DEFAULT_TTL", 30.0)
+
+# (regex on the lowercased, normalized command, TTL seconds) — first match wins, 0 = never cache.
+# PYATS_CACHE_TTLS='{"^show ip bgp": 120}' adds patterns that take precedence.
+DEFAULT_CACHE_TTLS = [
+    (r"^show (clock|logging|processes)", 0),
+    (r"^show (version|inventory|license|module|platform)", 3600),
+    (r"^show running-config", 60),
+    (r"^show (ip |ipv6 )?route", 30),
+    (r"^show (ip |ipv6 )?(ospf|bgp|eigrp|isis|pim)", 30),
+    (r"^show (ip |ipv6 )?interfaces? brief", 15),
+    (r"^show (interfaces|cdp|lldp|arp|mac)", 15),
+]
+
+
+def normalize_command(command: str) -> str:
+    # Whitespace only: ACL, route-map, prefix-list and VRF names are
+    # case-sensitive, so "ACL_A" and "acl_a" must not share a cache key.
+    return " ".join(command.split())
+
+
+def _load_cache_ttls() -> List[Any]:
+    rules = []
+    raw = os.getenv("PYATS_CACHE_TTLS")
+    if raw:
+        try:
+            rules.extend((pattern, float(ttl)) for pattern, ttl in json.loads(raw).items())
+        except Exception as e:
+            logger.warning(f"Ignoring invalid PYATS_CACHE_TTLS: {e}")
+    rules.extend(DEFAULT_CACHE_TTLS)
+    return [(re.compile(pattern), ttl) for pattern, ttl in rules]
+
+
+class ResultCache:
+    """
+    LRU cache of successful show command results keyed by
+    (device, normalized command), with a TTL chosen per command pattern.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, default_ttl: float = CACHE_DEFAULT_TTL):
+        self.max_entries = max(1, max_entries)
+        self.default_ttl = default_ttl
+        self._rules = _load_cache_ttls()
+        self._entries: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def ttl_for(self, command: str) -> float:
+        command = command.lower()
+        for pattern, ttl in self._rules:
+            if pattern.search(command):
+                return ttl
+        return self.default_ttl
+
+    def get(self, device_name: str, command: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached result that is fresh enough, else None."""
+        key = (device_name, normalize_command(command))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, ttl, result = entry
+                age = time.monotonic() - stored_at
+                if age <= (ttl if max_age is None else max_age):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    hit = dict(result)
+                    hit["cache"] = {"hit": True, "age_s": round(age, 1)}
+                    return hit
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, device_name: str, command: str, result: Dict[str, Any]) -> None:
+        if result.get("status") not in ("completed", "completed_raw"):
+            return
+        normalized = normalize_command(command)
+        ttl = self.ttl_for(normalized)
+        if ttl <= 0:
+            return
+        key = (device_name, normalized)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), ttl, result)
+            self._entries.move_to_end(key)
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, device_name: str) -> None:
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == device_name]
+            for key in stale:
+                del self._entries[key]
+            self._counters["invalidations"] += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 3) if lookups else 0.0,
+                **self._counters,
+            }
+
+
+_RESULT_CACHE = ResultCache()
+
+
+# ================================================================
+# PARSER AVAILABILITY CACHE
+# ================================================================
+PARSER_FAILURE_TTL = _env_float("PYATS_PARSER_FAILURE_TTL", 600.0)
+
+
+class ParserCache:
+    """
+    Remembers, per (os, platform, normalized command), whether Genie can
+    parse a command, so known-unparseable commands go straight to
+    `execute` instead of paying a failed `parse` round-trip first.
+
+    - "missing": Genie has no parser for the command; kept for the life
+      of the process.
+    - "failed": a parser exists but raised on real output; expires after
+      PYATS_PARSER_FAILURE_TTL so it is retried later.
+    - "ok": parser found (and, once used, parsed successfully).
+    """
+
+    def __init__(self, failure_ttl: float = PARSER_FAILURE_TTL):
+        self.failure_ttl = failure_ttl
+        self._entries: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "known_ok": 0, "known_missing": 0, "known_failed": 0}
+
+    @staticmethod
+    def _key(device, command: str):
+        return (
+            getattr(device, "os", None),
+            getattr(device, "platform", None),
+            normalize_command(command).lower(),
+        )
+
+    def should_parse(self, device, command: str) -> bool:
+        key = self._key(device, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                state, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._counters[f"known_{state}"] += 1
+                    return state == "ok"
+                del self._entries[key]
+            self._counters["lookups"] += 1
+
+        try:
+            _lazy_import("genie.libs.parser.utils").get_parser(command, device)
+            state = "ok"
+        except Exception as e:
+            logger.info(f"No Genie parser for '{command}' on {device.os}: {e}")
+            state = "missing"
+
+        with self._lock:
+            self._entries[key] = (state, None)
+        return state == "ok"
+
+    def record_failure(self, device, command: str, error: BaseException, live: bool = True) -> bool:
+        """
+        Mark the parser as failed, unless `error` says nothing about the
+        parser: empty output, or a session failure during a `live` parse
+        (one that ran the command itself). Returns True if recorded.
+        """
+        if any(cls.__name__ == "SchemaEmptyParserError" for cls in type(error).__mro__):
+            return False
+        if live and _session_unhealthy(device, error):
+            return False
+        with self._lock:
+            self._entries[self._key(device, command)] = (
+                "failed", time.monotonic() + self.failure_ttl
+            )
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            states: Dict[str, int] = {}
+            for state, _ in self._entries.values():
+                states[state] = states.get(state, 0) + 1
+            return {"entries": len(self._entries), "states": states, **self._counters}
+
+
+_PARSERS = ParserCache()
+
+
+def _parse_or_execute(device, device_name: str, command: str) -> Dict[str, Any]:
+    """Parse `command` when Genie can, otherwise (or on parse failure) execute it raw."""
+    execute_kind = "raw"
+    if _PARSERS.should_parse(device, command):
+        try:
+            logger.info(f"Attempting to parse command: '{command}' on {device_name}")
+            with _METRICS.timer("pyats_stage_seconds", stage="parse"):
+                parsed_output = device.parse(command)
+            _METRICS.inc("pyats_parse_total", result="parsed")
+            logger.info(f"Successfully parsed output for '{command}' on {device_name}")
+            return {"status": "completed", "device": device_name, "output": parsed_output}
+        except Exception as parse_exc:
+            _PARSERS.record_failure(device, command, parse_exc)
+            _METRICS.inc("pyats_parse_total", result="fallback")
+            execute_kind = "fallback"
+            logger.warning(
+                f"Parsing failed for '{command}' on {device_name}: {parse_exc}. Falling back to execute."
+            )
+    else:
+        _METRICS.inc("pyats_parse_total", result="skipped")
+        logger.info(f"Skipping parse for '{command}' on {device_name} (no usable parser)")
+
+    with _METRICS.timer("pyats_stage_seconds", stage=f"execute_{execute_kind}"):
+        raw_output = device.execute(command)
+    logger.info(f"Executed command (raw): '{command}' on {device_name}")
+    return {"status": "completed_raw", "device": device_name, "output": raw_output}
+
+
+# ================================================================
+# OUTPUT SANITIZING
+# ================================================================
+_ANSI_ESCAPE_RE = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+# An escape sequence cut off at the end of a chunk (ESC, or an unfinished CSI).
+_ANSI_PARTIAL_RE = re.compile(r"\x1B(?:\[[0-?]*[ -/]*)?")
+# ASCII control characters outside string.printable, deleted via bytes.translate.
+_UNPRINTABLE_ASCII = bytes(c for c in range(128) if chr(c) not in string.printable)
+
+
+def clean_output(output: str) -> str:
+    """
+    Strip ANSI escape sequences and keep only string.printable characters.
+
+    Non-ASCII is dropped by the ascii codec and the remaining control
+    characters by a bytes.translate delete table, both in C.
+    """
+    if "\x1b" in output:
+        output = _ANSI_ESCAPE_RE.sub("", output)
+    return output.encode("ascii", "ignore").translate(None, _UNPRINTABLE_ASCII).decode("ascii")
+
+
+class OutputSanitizer:
+    """
+    Chunked version of clean_output() for session output read in pieces.
+
+    An escape sequence split across chunks is held back until it is
+    complete, so feeding chunks and calling flush() yields exactly
+    clean_output() of the concatenated text.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        self._pending = ""
+        esc = text.rfind("\x1b")
+        if esc != -1 and _ANSI_PARTIAL_RE.fullmatch(text, esc):
+            self._pending = text[esc:]
+            text = text[:esc]
+        return clean_output(text)
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return clean_output(text)
+
+
+# ================================================================
+# RUNNING-CONFIG SNAPSHOTS
+# ================================================================
+CONFIG_SNAPSHOTS_PER_DEVICE = _env_int("PYATS_CONFIG_SNAPSHOTS", 5)
+
+# Noise in `show run` output that is not configuration.
+_CONFIG_NOISE_RE = re.compile(r"^(Building configuration\.\.\.|Current configuration ?:.*|end)$")
+_BANNER_RE = re.compile(r"^banner \S+ (\^C|\S)")
+
+
+def split_config_sections(config: str) -> "OrderedDict[str, str]":
+    """
+    Split an IOS-style running config into top-level sections.
+
+    Each unindented line starts a section ("interface Gi1", "router ospf 1",
+    "hostname R1", ...) and owns the indented lines below it. Banners are
+    kept whole up to their closing delimiter. A repeated header gets a
+    " #2", " #3"... suffix so every section has a unique key.
+    """
+    sections: "OrderedDict[str, List[str]]" = OrderedDict()
+    current: Optional[List[str]] = None
+    banner_end: Optional[str] = None
+
+    for line in config.splitlines():
+        line = line.rstrip()
+        if banner_end is not None:
+            current.append(line)
+            if banner_end in line:
+                banner_end = None
+            continue
+        if not line or line.startswith("!") or _CONFIG_NOISE_RE.match(line):
+            continue
+        if line[0] in " \t":
+            if current is not None:
+                current.append(line)
+            continue
+
+        key = line
+        n = 2
+        while key in sections:
+            key = f"{line} #{n}"
+            n += 1
+        current = sections[key] = [line]
+
+        banner = _BANNER_RE.match(line)
+        if banner and line.count(banner.group(1)) < 2:
+            banner_end = banner.group(1)
+
+    return OrderedDict((key, "\n".join(lines)) for key, lines in sections.items())
+
+
+class ConfigSnapshots:
+    """
+    Last few running-config snapshots per device, split into sections.
+
+    Snapshot ids are the first 12 hex digits of the config's sha256, so the
+    same config always gets the same id and clients can keep it as a
+    content hash.
+    """
+
+    def __init__(self, per_device: int = CONFIG_SNAPSHOTS_PER_DEVICE):
+        self.per_device = max(1, per_device)
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, List[Dict[str, Any]]] = {}
+        self._changed_at: Dict[str, float] = {}
+
+    def record(self, device_name: str, config: str) -> Dict[str, Any]:
+        sections = split_config_sections(config)
+        digest = hashlib.sha256("\n".join(sections.values()).encode()).hexdigest()
+        snapshot = {
+            "id": digest[:12],
+            "hash": digest,
+            "taken_at": time.time(),
+            "sections": sections,
+        }
+        with self._lock:
+            history = self._snapshots.setdefault(device_name, [])
+            history[:] = [s for s in history if s["id"] != snapshot["id"]]
+            history.append(snapshot)
+            del history[:-self.per_device]
+        return snapshot
+
+    def get(self, device_name: str, snapshot_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            for snapshot in self._snapshots.get(device_name, []):
+                if snapshot["id"] == snapshot_id or snapshot["hash"] == snapshot_id:
+                    return snapshot
+        return None
+
+    def latest(self, device_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            history = self._snapshots.get(device_name)
+            return history[-1] if history else None
+
+    def current(self, device_name: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """The latest snapshot if it is younger than `max_age` and no config was pushed since."""
+        snapshot = self.latest(device_name)
+        if snapshot is None:
+            return None
+        with self._lock:
+            changed_at = self._changed_at.get(device_name, 0.0)
+        if snapshot["taken_at"] <= changed_at or time.time() - snapshot["taken_at"] > max_age:
+            return None
+        return snapshot
+
+    def mark_changed(self, device_name: str) -> None:
+        """Record that the device's config changed, so existing snapshots are not current."""
+        with self._lock:
+            self._changed_at[device_name] = time.time()
+
+    @staticmethod
+    def diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        old_sections, new_sections = old["sections"], new["sections"]
+        return {
+            "added": {k: v for k, v in new_sections.items() if k not in old_sections},
+            "removed": [k for k in old_sections if k not in new_sections],
+            "modified": {
+                k: v for k, v in new_sections.items()
+                if k in old_sections and old_sections[k] != v
+            },
+        }
+
+
+# Lines that only move between config modes; indentation already says that.
+_CONFIG_MODE_LINES = {"exit", "end"}
+
+
+def build_config_tree(config: str) -> "OrderedDict[str, OrderedDict]":
+    """
+    Parse IOS-style config into a tree keyed by whitespace-normalized line,
+    using indentation for hierarchy. A multi-line banner is one key.
+    """
+    root: "OrderedDict[str, OrderedDict]" = OrderedDict()
+    stack: List[tuple] = [(-1, root)]
+    lines = iter(config.splitlines())
+    for raw in lines:
+        text = raw.strip()
+        if not text or text.startswith("!") or text in _CONFIG_MODE_LINES or _CONFIG_NOISE_RE.match(text):
+            continue
+        indent = len(raw) - len(raw.lstrip())
+        key = " ".join(text.split())
+        banner = _BANNER_RE.match(key)
+        if banner and key.count(banner.group(1)) < 2:
+            body = [key]
+            for more in lines:
+                body.append(more.rstrip())
+                if banner.group(1) in more:
+                    break
+            key = "\n".join(body)
+        while stack[-1][0] >= indent:
+            stack.pop()
+        node = stack[-1][1].setdefault(key, OrderedDict())
+        stack.append((indent, node))
+    return root
+
+
+def _count_config_lines(tree: "OrderedDict[str, OrderedDict]") -> int:
+    return sum(1 + _count_config_lines(children) for children in tree.values())
+
+
+def _config_lines(tree: "OrderedDict[str, OrderedDict]", depth: int, out: List[str]) -> None:
+    for line, children in tree.items():
+        out.append(" " * depth + line)
+        _config_lines(children, depth + 1, out)
+
+
+def _missing_config_lines(intended, running, depth: int, out: List[str]) -> None:
+    for line, children in intended.items():
+        # A "no X" line is skipped only when the running config literally
+        # shows "no X": features that are on by default never appear in
+        # `show running-config`, and re-sending "no X" is harmless.
+        if line not in running:
+            out.append(" " * depth + line)
+            _config_lines(children, depth + 1, out)
+            continue
+        missing: List[str] = []
+        _missing_config_lines(children, running[line], depth + 1, missing)
+        if missing:
+            # Re-enter the parent's mode for the missing children.
+            out.append(" " * depth + line)
+            out.extend(missing)
+
+
+def minimal_config_lines(intended: str, running: str) -> tuple:
+    """
+    Lines of `intended` that are not already in `running`, with parent
+    lines kept for context. Returns (lines to send, intended line count).
+    Lines must be written as in `show running-config` to be recognised;
+    anything else is simply sent.
+    """
+    intended_tree = build_config_tree(intended)
+    out: List[str] = []
+    _missing_config_lines(intended_tree, build_config_tree(running), 0, out)
+    return out, _count_config_lines(intended_tree)
+
+
+_CONFIG_SNAPSHOTS = ConfigSnapshots()
+
+
+# ================================================================
+# LOG CURSORS
+# ================================================================
+LOG_INITIAL_LINES = _env_int("PYATS_LOG_INITIAL_LINES", 250)
+LOG_MIN_LINES = _env_int("PYATS_LOG_MIN_LINES", 20)
+LOG_MAX_LINES = _env_int("PYATS_LOG_MAX_LINES", 2000)
+
+_MONTHS = {
+    m: i for i, m in enumerate(
+        ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1
+    )
+}
+# "<prefix>%FACILITY-SEVERITY-MNEMONIC: message"; the prefix carries the
+# optional sequence number, timestamp and (NX-OS) hostname.
+_LOG_LINE_RE = re.compile(
+    r"^(?P<prefix>[^%]*)%(?P<facility>[A-Z0-9_]+(?:-[A-Z0-9_]+)*?)"
+    r"-(?P<severity>[0-7])-(?P<mnemonic>[A-Z0-9_]+)\s*:\s*(?P<message>.*)$"
+)
+_LOG_SEQ_RE = re.compile(r"^\s*(\d+):")
+_LOG_TS_RE = re.compile(
+    r"(?:\d{4}\s+)?(?P<mon>[A-Z][a-z]{2})\s+(?P<day>\d{1,2})\s+(?:\d{4}\s+)?"
+    r"(?P<h>\d{1,2}):(?P<m>\d{2}):(?P<s>\d{2}(?:\.\d+)?)(?:\s+[A-Z]{2,5}\b)?"
+)
+
+
+def _log_time_key(text: str) -> Optional[tuple]:
+    """(month, day, seconds) for a syslog timestamp; the year is ignored."""
+    match = _LOG_TS_RE.search(text)
+    if not match or match.group("mon") not in _MONTHS:
+        return None
+    seconds = int(match.group("h")) * 3600 + int(match.group("m")) * 60 + float(match.group("s"))
+    return (_MONTHS[match.group("mon")], int(match.group("day")), seconds)
+
+
+def parse_log_lines(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse IOS/NX-OS syslog output into records with seq, timestamp,
+    facility, severity, mnemonic and message. Lines that do not start a
+    new message are treated as continuations of the previous one; banner
+    lines before the first message are dropped.
+    """
+    records: List[Dict[str, Any]] = []
+    for line in text.splitlines():
+        match = _LOG_LINE_RE.match(line)
+        if not match:
+            if records and line.strip():
+                records[-1]["message"] += " " + line.strip()
+                records[-1]["_raw"] += "\n" + line
+            continue
+        prefix = match.group("prefix")
+        seq = _LOG_SEQ_RE.match(prefix)
+        timestamp = _LOG_TS_RE.search(prefix)
+        records.append({
+            "seq": int(seq.group(1)) if seq else None,
+            "timestamp": timestamp.group(0) if timestamp else None,
+            "facility": match.group("facility"),
+            "severity": int(match.group("severity")),
+            "mnemonic": match.group("mnemonic"),
+            "message": match.group("message").strip(),
+            "_raw": line,
+        })
+    return records
+
+
+def _log_record_cursor(record: Dict[str, Any]) -> str:
+    if record["seq"] is not None:
+        return f"seq:{record['seq']}"
+    digest = hashlib.blake2b(record["_raw"].encode(), digest_size=4).hexdigest()
+    return f"ts:{record['timestamp'] or ''}@{digest}"
+
+
+def parse_log_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Accept a cursor returned by pyats_show_logging ("seq:N" or
+    "ts:<timestamp>@<hash>"), a bare sequence number, or a syslog
+    timestamp such as "Mar 1 10:15:00".
+    """
+    cursor = cursor.strip()
+    if cursor.isdigit() or cursor.startswith("seq:") and cursor[4:].isdigit():
+        return {"seq": int(cursor.rsplit(":", 1)[-1])}
+    digest = None
+    if cursor.startswith("ts:"):
+        cursor, _, digest = cursor[3:].rpartition("@")
+    time_key = _log_time_key(cursor) if cursor else None
+    if time_key is None and not digest:
+        raise ValueError(
+            f"Unrecognised log cursor '{cursor}'; use a cursor returned by "
+            "pyats_show_logging, a sequence number or a timestamp like 'Mar 1 10:15:00'"
+        )
+    return {"time": time_key, "hash": digest}
+
+
+def select_new_log_records(
+    records: List[Dict[str, Any]], cursor: Dict[str, Any]
+) -> tuple:
+    """
+    Return (records newer than `cursor`, whether the cursor position was
+    inside `records`). When it was not, older entries may be missing.
+    """
+    if "seq" in cursor:
+        seqs = [r for r in records if r["seq"] is not None]
+        if seqs:
+            # Lines without a sequence number (mixed sources) are compared
+            # by timestamp with the last record at or before the cursor.
+            anchor = next((r for r in reversed(seqs) if r["seq"] <= cursor["seq"]), None)
+            anchor_time = _log_time_key(anchor["timestamp"] or "") if anchor else None
+            new = []
+            for r in records:
+                if r["seq"] is not None:
+                    if r["seq"] > cursor["seq"]:
+                        new.append(r)
+                    continue
+                key = _log_time_key(r["timestamp"] or "")
+                if anchor_time is None or key is None or key > anchor_time:
+                    new.append(r)
+            return new, anchor is not None
+
+    if cursor.get("hash"):
+        for i in range(len(records) - 1, -1, -1):
+            if _log_record_cursor(records[i]).endswith("@" + cursor["hash"]):
+                return records[i + 1:], True
+
+    if cursor.get("time") is None:
+        return records, False
+    keyed = [(r, _log_time_key(r["timestamp"] or "")) for r in records]
+    newer = [r for r, key in keyed if key is None or key > cursor["time"]]
+    return newer, any(key is not None and key <= cursor["time"] for _, key in keyed)
+
+
+class LogCursors:
+    """
+    Per-device log position and how many lines the next poll should ask
+    for. The line count follows the recent message rate, so a quiet
+    device is polled with a `show logging last <LOG_MIN_LINES>`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, device_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            state = self._state.get(device_name)
+            return dict(state) if state else None
+
+    def update(self, device_name: str, cursor: Optional[str], new_records: int) -> None:
+        lines = min(LOG_MAX_LINES, max(LOG_MIN_LINES, new_records * 2 + LOG_MIN_LINES))
+        with self._lock:
+            self._state[device_name] = {"cursor": cursor, "lines": lines, "updated": time.time()}
+
+    def reset(self, device_name: str) -> None:
+        with self._lock:
+            self._state.pop(device_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: {"cursor": s["cursor"], "lines": s["lines"]} for name, s in self._state.items()}
+
+
+_LOG_CURSORS = LogCursors()
+
+
+# ================================================================
+# OUTPUT PROJECTION (select / where)
+# ================================================================
+# Paths are dotted keys into the parsed output, e.g. "interface.*.status".
+# A segment may be a glob ("Gig*") and may be double-quoted when the key
+# itself contains dots ('routes."10.0.0.0/24".active').
+_WHERE_RE = re.compile(
+    r'^\s*(?P<path>(?:"[^"]*"|[^\s=!~<>"])+)\s*(?P<op>==|!=|!~|~|<=|>=|<|>)\s*(?P<value>.*?)\s*$'
+)
+_GLOB_CHARS = set("*?[")
+_NO_MATCH = object()
+
+
+def _split_path(path: str) -> List[str]:
+    segments = [m.group(1) if m.group(1) is not None else m.group(2)
+                for m in re.finditer(r'"([^"]*)"|([^.]+)', path.strip())]
+    if not segments:
+        raise ValueError(f"Empty path in '{path}'")
+    return segments
+
+
+def _segment_matches(segment: str, key: Any) -> bool:
+    key = str(key)
+    if _GLOB_CHARS & set(segment):
+        return fnmatch.fnmatchcase(key, segment)
+    return key == segment
+
+
+def _children(node: Any):
+    if isinstance(node, dict):
+        return node.items()
+    if isinstance(node, (list, tuple)):
+        return enumerate(node)
+    return ()
+
+
+def _values_at(node: Any, segments: List[str]) -> List[Any]:
+    """All values reached by `segments` from `node` (globs fan out)."""
+    nodes = [node]
+    for segment in segments:
+        nodes = [v for n in nodes for k, v in _children(n) if _segment_matches(segment, k)]
+    return nodes
+
+
+def _has_leaves(node: Any) -> bool:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, (dict, list, tuple)):
+            return True
+        stack.extend(v for _, v in _children(node))
+    return False
+
+
+def _merge_tries(tries: List[Optional[dict]]) -> Optional[dict]:
+    if any(t is None for t in tries):
+        return None
+    merged: Dict[str, List[Optional[dict]]] = {}
+    for trie in tries:
+        for segment, sub in trie.items():
+            merged.setdefault(segment, []).append(sub)
+    return {segment: _merge_tries(subs) for segment, subs in merged.items()}
+
+
+def _project(node: Any, trie: Optional[dict]) -> Any:
+    """Keep only the parts of `node` named by `trie` (None = keep all)."""
+    if trie is None:
+        return node
+    if not isinstance(node, (dict, list, tuple)):
+        return _NO_MATCH
+    kept = []
+    for key, value in _children(node):
+        subs = [sub for segment, sub in trie.items() if _segment_matches(segment, key)]
+        if not subs:
+            continue
+        value = _project(value, _merge_tries(subs))
+        if value is not _NO_MATCH:
+            kept.append((key, value))
+    if not kept:
+        return _NO_MATCH
+    return dict(kept) if isinstance(node, dict) else [v for _, v in kept]
+
+
+class _Condition:
+    def __init__(self, text: str):
+        match = _WHERE_RE.match(text)
+        if not match:
+            raise ValueError(
+                f"Cannot parse where clause '{text}'; expected '<path> <op> <value>' "
+                "with op one of == != ~ !~ < <= > >="
+            )
+        segments = _split_path(match.group("path"))
+        glob_at = next((i for i, s in enumerate(segments) if _GLOB_CHARS & set(s)), None)
+        if glob_at is None:
+            raise ValueError(f"where path '{match.group('path')}' needs a * to mark the entries to filter")
+        self.prefix = segments[:glob_at]
+        self.entries = segments[glob_at]
+        self.field = segments[glob_at + 1:]
+        self.op = match.group("op")
+        self.value = match.group("value").strip("'\"")
+        self.regex = re.compile(self.value, re.IGNORECASE) if "~" in self.op else None
+
+    def _test(self, actual: Any) -> bool:
+        if self.regex is not None:
+            return bool(self.regex.search(str(actual)))
+        if isinstance(actual, bool):
+            actual = str(actual).lower()
+        try:
+            left, right = float(actual), float(self.value)
+        except (TypeError, ValueError):
+            left, right = str(actual), self.value
+        if self.op == "==":
+            return left == right
+        if self.op == "!=":
+            return left != right
+        try:
+            return {"<": left < right, "<=": left <= right, ">": left > right, ">=": left >= right}[self.op]
+        except TypeError:
+            return False
+
+    def keep(self, entry: Any) -> bool:
+        values = _values_at(entry, self.field)
+        if self.op in ("!=", "!~"):
+            if self.op == "!~":
+                return not any(self.regex.search(str(v)) for v in values)
+            return all(self._test(v) for v in values)
+        return any(self._test(v) for v in values)
+
+    def apply(self, node: Any, prefix: Optional[List[str]] = None) -> Any:
+        prefix = self.prefix if prefix is None else prefix
+        if prefix:
+            if not isinstance(node, (dict, list)):
+                return node
+            copy = dict(node) if isinstance(node, dict) else list(node)
+            for key, value in _children(node):
+                if _segment_matches(prefix[0], key):
+                    copy[key] = self.apply(value, prefix[1:])
+            return copy
+        if isinstance(node, dict):
+            return {k: v for k, v in node.items()
+                    if not _segment_matches(self.entries, k) or self.keep(v)}
+        if isinstance(node, (list, tuple)):
+            return [v for i, v in enumerate(node)
+                    if not _segment_matches(self.entries, i) or self.keep(v)]
+        return node
+
+
+class OutputProjection:
+    """
+    Filter (`where`) and trim (`select`) parsed output before it is
+    normalized and encoded. Shared structures (e.g. cached results) are
+    copied, never modified.
+    """
+
+    def __init__(self, select: Optional[List[str]] = None, where: Optional[str] = None):
+        if isinstance(select, str):
+            select = [p for p in select.split(",") if p.strip()]
+        self.select = list(select or [])
+        self.where = where
+        self.conditions = [
+            _Condition(part)
+            for part in re.split(r"\s+and\s+", where.strip(), flags=re.IGNORECASE)
+        ] if where and where.strip() else []
+        self.trie: Optional[dict] = None
+        if self.select:
+            self.trie = {}
+            for path in self.select:
+                node = self.trie
+                segments = _split_path(path)
+                for segment in segments[:-1]:
+                    node = node.setdefault(segment, {})
+                    if node is None:
+                        break
+                else:
+                    node[segments[-1]] = None
+
+    @classmethod
+    def compile(cls, select: Optional[List[str]], where: Optional[str]) -> Optional["OutputProjection"]:
+        """Parse select/where; None when neither is given. Raises ValueError."""
+        if not select and not (where and where.strip()):
+            return None
+        return cls(select, where)
+
+    def apply_to_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Return a copy of `result` whose parsed `output` is projected."""
+        if result.get("status") != "completed":
+            if result.get("status") == "completed_raw":
+                result = dict(result)
+                result["note"] = "select/where apply to parsed output only; raw output returned"
+            return result
+        output = result.get("output")
+        with _METRICS.timer("pyats_stage_seconds", stage="project"):
+            for condition in self.conditions:
+                output = condition.apply(output)
+            if self.trie is not None:
+                output = _project(output, self.trie)
+        result = dict(result)
+        if output is _NO_MATCH or not _has_leaves(output):
+            result["output"] = {}
+            result["note"] = "select/where matched nothing in the parsed output"
+        else:
+            result["output"] = output
+        return result
+
+
+# ================================================================
+# CORE COMMAND RUNNERS
+# (merged / upgraded from your second script)
+# ================================================================
+DISALLOWED_SHOW_TERMS = frozenset([
+    "|", "include", "exclude", "begin", "redirect",
+    ">", "<", "config", "copy", "delete", "erase", "reload", "write"
+])
+
+
+def _check_show_command(command: str) -> Optional[str]:
+    """Return an error message if `command` is not a safe 'show' command."""
+    command_lower = command.lower().strip()
+
+    if not command_lower.startswith("show"):
+        return f"Command '{command}' is not a 'show' command."
+
+    for part in command_lower.split():
+        if part in DISALLOWED_SHOW_TERMS:
+            return f"Command '{command}' contains disallowed term '{part}'."
+    return None
+
+
+async def run_show_command_async(
+    device_name: str,
+    command: str,
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+    select: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Execute a show command on a device with safety checks.
+
+    Served from the result cache when an entry is younger than `max_age`
+    (or the command's TTL when `max_age` is None); `force_refresh` always
+    goes to the device. `select`/`where` trim the parsed output (see
+    OutputProjection); the cache keeps the full result.
+    """
+    try:
+        error = _check_show_command(command)
+        if error:
+            return {"status": "error", "error": error}
+        projection = OutputProjection.compile(select, where)
+
+        result = None
+        if not force_refresh:
+            result = _cached_show_result(device_name, command, max_age)
+        if result is None:
+            result = await _SCHEDULER.run(device_name, _execute_show_command, device_name, command)
+            _RESULT_CACHE.put(device_name, command, result)
+            _record_history(device_name, command, result)
+
+        if projection is not None:
+            result = projection.apply_to_result(result)
+        return result
+
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+    except Exception as e:
+        logger.error(f"Error in run_show_command_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Execution error: {e}"}
+
+
+def _cached_show_result(device_name: str, command: str, max_age: Optional[float]) -> Optional[Dict[str, Any]]:
+    cached = _RESULT_CACHE.get(device_name, command, max_age)
+    if cached is None:
+        cached = _STATE_STORE.get(device_name, command, max_age)
+    _METRICS.inc("pyats_result_cache_total", result="hit" if cached else "miss")
+    if cached is not None:
+        stats = _RESULT_CACHE.stats()
+        logger.info(
+            f"🗃️ Cache hit for '{command}' on {device_name} "
+            f"(age {cached['cache']['age_s']}s, hit rate {stats['hit_rate']:.0%})"
+        )
+    return cached
+
+
+def _execute_show_command(device_name: str, command: str) -> Dict[str, Any]:
+    """Synchronous helper for show command execution."""
+    try:
+        with _POOL.session(device_name) as device:
+            return _parse_or_execute(device, device_name, command)
+
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="show")
+        logger.error(f"Error executing show command: {e}", exc_info=True)
+        return {"status": "error", "error": f"Execution error: {e}"}
+
+
+async def run_show_commands_async(
+    device_name: str,
+    commands: List[str],
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """Run several show commands on one device in a single session."""
+    try:
+        started = time.monotonic()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(commands)
+        pending: List[int] = []
+
+        for i, command in enumerate(commands):
+            error = _check_show_command(command)
+            if error:
+                results[i] = {"command": command, "status": "error", "error": error}
+                continue
+            cached = None if force_refresh else _cached_show_result(device_name, command, max_age)
+            if cached is not None:
+                cached.pop("device", None)
+                results[i] = {"command": command, **cached}
+            else:
+                pending.append(i)
+
+        if pending:
+            batch = [commands[i] for i in pending]
+            executed = await _SCHEDULER.run(device_name, _execute_show_commands, device_name, batch)
+            for i, result in zip(pending, executed):
+                _RESULT_CACHE.put(device_name, commands[i], result)
+                _record_history(device_name, commands[i], result)
+                result = {k: v for k, v in result.items() if k != "device"}
+                results[i] = {"command": commands[i], **result}
+
+        failed = sum(1 for r in results if r["status"] in ("error", "skipped"))
+        return {
+            "status": "completed" if not failed else (
+                "partial" if failed < len(results) else "error"
+            ),
+            "device": device_name,
+            "summary": {
+                "commands": len(results),
+                "succeeded": len(results) - failed,
+                "failed": failed,
+                "from_cache": sum(1 for r in results if r.get("cache")),
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            },
+            "results": results,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in run_show_commands_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Execution error: {e}"}
+
+
+def _execute_show_commands(device_name: str, commands: List[str]) -> List[Dict[str, Any]]:
+    """Synchronous helper: run `commands` back to back on one pooled session."""
+    results: List[Dict[str, Any]] = []
+    try:
+        with _POOL.session(device_name) as device:
+            for command in commands:
+                t0 = time.monotonic()
+                try:
+                    result = _parse_or_execute(device, device_name, command)
+                except Exception as e:
+                    results.append({
+                        "status": "error",
+                        "error": f"Execution error: {e}",
+                        "elapsed_ms": round((time.monotonic() - t0) * 1000),
+                    })
+                    if _session_unhealthy(device, e):
+                        raise
+                    # The device rejected this command; the session is fine.
+                    _METRICS.inc("pyats_errors_total", stage="show")
+                    logger.warning(f"Command '{command}' failed on {device_name}: {e}")
+                    continue
+                result["elapsed_ms"] = round((time.monotonic() - t0) * 1000)
+                results.append(result)
+
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="show")
+        logger.error(f"Error executing show commands: {e}", exc_info=True)
+        if not results:
+            results.append({"status": "error", "error": f"Execution error: {e}"})
+        # The session is gone; don't send the remaining commands.
+        results.extend(
+            {"status": "skipped", "error": "Not run: session failed on an earlier command"}
+            for _ in commands[len(results):]
+        )
+    return results
+
+
+FANOUT_CONCURRENCY = _env_int("PYATS_FANOUT_CONCURRENCY", 8)
+FANOUT_TIMEOUT = _env_float("PYATS_FANOUT_TIMEOUT", 300.0)
+
+
+def _resolve_devices(targets: List[str]) -> Dict[str, Any]:
+    """
+    Expand device names, group names and "all" into testbed device names.
+
+    A device belongs to the groups listed under `groups:` or `custom.groups:`
+    in its testbed entry, plus implicit groups for its `type` and `os`
+    (e.g. "router", "switch", "iosxe", "linux").
+    """
+    devices = _TESTBED.devices()
+    groups: Dict[str, List[str]] = {}
+    for name, device in devices.items():
+        raw = _TESTBED.raw_device(name)
+        custom = raw.get("custom") or {}
+        member_of = list(raw.get("groups") or []) + list(custom.get("groups") or [])
+        member_of += [getattr(device, "type", None), getattr(device, "os", None)]
+        for group in member_of:
+            if group:
+                groups.setdefault(str(group), []).append(name)
+
+    resolved: List[str] = []
+    unknown: List[str] = []
+    for target in targets:
+        target = target.strip()
+        if not target:
+            continue
+        if target.lower() == "all":
+            matches = list(devices)
+        elif target in devices:
+            matches = [target]
+        elif target in groups:
+            matches = groups[target]
+        else:
+            unknown.append(target)
+            continue
+        resolved.extend(m for m in matches if m not in resolved)
+
+    return {"devices": resolved, "unknown": unknown}
+
+
+async def run_show_command_multi_async(
+    targets: List[str],
+    command: str,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+    select: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run one show command on many devices concurrently and merge the results."""
+    try:
+        error = _check_show_command(command)
+        if error:
+            return {"status": "error", "error": error}
+        OutputProjection.compile(select, where)
+
+        selection = await asyncio.to_thread(_resolve_devices, targets)
+        device_names = selection["devices"]
+        if not device_names:
+            return {
+                "status": "error",
+                "error": f"No testbed devices matched {targets}.",
+                "unknown": selection["unknown"],
+            }
+
+        limit = max(1, max_concurrency or FANOUT_CONCURRENCY)
+        per_device_timeout = timeout or FANOUT_TIMEOUT
+        semaphore = asyncio.Semaphore(limit)
+        started = time.monotonic()
+
+        async def _one(name: str) -> Dict[str, Any]:
+            async with semaphore:
+                t0 = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(
+                        run_show_command_async(name, command, max_age, force_refresh, select, where),
+                        per_device_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    result = {
+                        "status": "error",
+                        "error": f"Timed out after {per_device_timeout:.0f}s",
+                    }
+                except Exception as e:
+                    result = {"status": "error", "error": f"Execution error: {e}"}
+                result = {k: v for k, v in result.items() if k != "device"}
+                result["elapsed_ms"] = round((time.monotonic() - t0) * 1000)
+                return result
+
+        outcomes = await asyncio.gather(*(_one(name) for name in device_names))
+        results = dict(zip(device_names, outcomes))
+        failed = [name for name, r in results.items() if r.get("status") == "error"]
+
+        return {
+            "status": "completed" if not failed else (
+                "partial" if len(failed) < len(results) else "error"
+            ),
+            "command": command,
+            "summary": {
+                "devices": len(results),
+                "succeeded": len(results) - len(failed),
+                "failed": failed,
+                "unknown": selection["unknown"],
+                "max_concurrency": limit,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            },
+            "results": results,
+        }
+
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+    except Exception as e:
+        logger.error(f"Error in run_show_command_multi_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Execution error: {e}"}
+
+
+def _check_config(config_commands: str) -> Optional[str]:
+    """Return an error message if the configuration must not be sent, else None."""
+    if "erase" in config_commands.lower() or "write erase" in config_commands.lower():
+        return "Potentially dangerous command detected (erase). Operation aborted."
+    return None
+
+
+async def apply_device_configuration_async(
+    device_name: str,
+    config_commands: str,
+    minimal: bool = False,
+) -> Dict[str, Any]:
+    """
+    Apply configuration to a device (with basic safety checks).
+
+    With `minimal`, only lines missing from the running config are sent
+    (see minimal_config_lines).
+    """
+    try:
+        error = _check_config(config_commands)
+        if error:
+            logger.warning(f"Rejected potentially dangerous command on {device_name}: {config_commands}")
+            return {"status": "error", "error": error}
+
+        execute = _execute_minimal_config if minimal else _execute_config
+        try:
+            result = await _SCHEDULER.run(device_name, execute, device_name, config_commands)
+        finally:
+            _RESULT_CACHE.invalidate(device_name)
+            _STATE_STORE.invalidate(device_name)
+            _CONFIG_SNAPSHOTS.mark_changed(device_name)
+        return result
+
+    except Exception as e:
+        logger.error(f"Error in apply_device_configuration_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Configuration error: {e}"}
+
+
+CONFIG_WAVE_SIZE = _env_int("PYATS_CONFIG_WAVE_SIZE", 10)
+CONFIG_MAX_FAILURE_RATE = _env_float("PYATS_CONFIG_MAX_FAILURE_RATE", 0.2)
+
+
+async def apply_device_configuration_multi_async(
+    targets: List[str],
+    config_commands: str,
+    wave_size: Optional[int] = None,
+    max_failure_rate: Optional[float] = None,
+    timeout: Optional[float] = None,
+    minimal: bool = False,
+) -> Dict[str, Any]:
+    """
+    Push the same configuration to many devices in waves.
+
+    Devices in a wave are configured in parallel. When the share of failed
+    devices in a wave exceeds `max_failure_rate`, later waves are not
+    started and their devices are reported as not attempted.
+    """
+    try:
+        error = _check_config(config_commands)
+        if error:
+            logger.warning(f"Rejected potentially dangerous command for {targets}: {config_commands}")
+            return {"status": "error", "error": error}
+        if not config_commands.strip():
+            return {"status": "error", "error": "Empty configuration provided."}
+
+        selection = await asyncio.to_thread(_resolve_devices, targets)
+        device_names = selection["devices"]
+        if not device_names:
+            return {
+                "status": "error",
+                "error": f"No testbed devices matched {targets}.",
+                "unknown": selection["unknown"],
+            }
+
+        size = max(1, wave_size or CONFIG_WAVE_SIZE)
+        threshold = CONFIG_MAX_FAILURE_RATE if max_failure_rate is None else max_failure_rate
+        per_device_timeout = timeout or FANOUT_TIMEOUT
+        waves = [device_names[i:i + size] for i in range(0, len(device_names), size)]
+        started = time.monotonic()
+
+        async def _one(name: str, wave: int) -> Dict[str, Any]:
+            t0 = time.monotonic()
+            try:
+                result = await asyncio.wait_for(
+                    apply_device_configuration_async(name, config_commands, minimal), per_device_timeout
+                )
+            except asyncio.TimeoutError:
+                result = {
+                    "status": "error",
+                    "error": f"Timed out after {per_device_timeout:.0f}s (the push may still complete)",
+                }
+            result = dict(result)
+            result["wave"] = wave
+            result["elapsed_ms"] = round((time.monotonic() - t0) * 1000)
+            return result
+
+        results: Dict[str, Dict[str, Any]] = {}
+        wave_reports: List[Dict[str, Any]] = []
+        stopped_after: Optional[int] = None
+        for number, wave in enumerate(waves, 1):
+            t0 = time.monotonic()
+            logger.info(f"🌊 Config wave {number}/{len(waves)}: {', '.join(wave)}")
+            outcomes = await asyncio.gather(*(_one(name, number) for name in wave))
+            results.update(zip(wave, outcomes))
+            failed = sum(1 for r in outcomes if r.get("status") != "success")
+            wave_reports.append({
+                "wave": number,
+                "devices": len(wave),
+                "failed": failed,
+                "elapsed_ms": round((time.monotonic() - t0) * 1000),
+            })
+            if failed / len(wave) > threshold and number < len(waves):
+                stopped_after = number
+                logger.warning(
+                    f"🛑 Config wave {number} failure rate {failed}/{len(wave)} "
+                    f"exceeds {threshold:.0%}; stopping rollout"
+                )
+                break
+
+        not_attempted = [name for name in device_names if name not in results]
+        for name in not_attempted:
+            results[name] = {"status": "not_attempted"}
+        failed_devices = [n for n, r in results.items() if r["status"] not in ("success", "not_attempted")]
+        succeeded = len(device_names) - len(failed_devices) - len(not_attempted)
+
+        if stopped_after is not None:
+            status = "stopped"
+        elif not failed_devices:
+            status = "success"
+        else:
+            status = "partial" if succeeded else "error"
+        return {
+            "status": status,
+            "summary": {
+                "devices": len(device_names),
+                "succeeded": succeeded,
+                "failed": failed_devices,
+                "not_attempted": not_attempted,
+                "unknown": selection["unknown"],
+                "wave_size": size,
+                "max_failure_rate": threshold,
+                "stopped_after_wave": stopped_after,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            },
+            "waves": wave_reports,
+            "results": results,
+        }
+
+    except Exception as e:
+        logger.error(f"Error in apply_device_configuration_multi_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Configuration error: {e}"}
+
+
+MINIMAL_PUSH_MAX_AGE = _env_float("PYATS_MINIMAL_PUSH_MAX_AGE", 300.0)
+
+
+def _execute_minimal_config(device_name: str, config_commands: str) -> Dict[str, Any]:
+    """
+    Synchronous helper for a minimal push: compare the intended lines with
+    the running config (a current snapshot, else fetched on the same
+    session) and configure only what is missing.
+    """
+    try:
+        cleaned_config = textwrap.dedent(config_commands.strip("\n"))
+        if not cleaned_config.strip():
+            return {"status": "error", "error": "Empty configuration provided."}
+
+        with _POOL.session(device_name) as device:
+            snapshot = _CONFIG_SNAPSHOTS.current(device_name, MINIMAL_PUSH_MAX_AGE)
+            if snapshot is not None:
+                running = "\n".join(snapshot["sections"].values())
+                source = f"snapshot {snapshot['id']}"
+            else:
+                device.enable()
+                # Not recorded: the snapshot store holds only the 'show run
+                # brief' output of learn_config, which changes_only diffs against.
+                running = clean_output(device.execute("show running-config"))
+                source = "device"
+
+            to_send, intended = minimal_config_lines(cleaned_config, running)
+            summary = {
+                "intended_lines": intended,
+                "sent_lines": len(to_send),
+                "skipped_lines": intended - len(to_send),
+                "running_config": source,
+            }
+            if not to_send:
+                logger.info(f"Configuration already present on {device_name}; nothing sent")
+                return {
+                    "status": "success",
+                    "message": f"Configuration already present on {device_name}; nothing sent.",
+                    "summary": summary,
+                    "sent": [],
+                }
+
+            logger.info(
+                f"Applying minimal configuration on {device_name} "
+                f"({len(to_send)}/{intended} lines):\n" + "\n".join(to_send)
+            )
+            output = device.configure("\n".join(to_send))
+            return {
+                "status": "success",
+                "message": f"Configuration applied on {device_name}.",
+                "summary": summary,
+                "sent": to_send,
+                "output": output,
+            }
+
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="configure")
+        logger.error(f"Error applying minimal configuration: {e}", exc_info=True)
+        return {"status": "error", "error": f"Configuration error: {e}"}
+
+
+def _execute_config(device_name: str, config_commands: str) -> Dict[str, Any]:
+    """Synchronous helper for configuration application."""
+    try:
+        cleaned_config = textwrap.dedent(config_commands.strip())
+        if not cleaned_config:
+            return {"status": "error", "error": "Empty configuration provided."}
+
+        with _POOL.session(device_name) as device:
+            logger.info(f"Applying configuration on {device_name}:\n{cleaned_config}")
+            output = device.configure(cleaned_config)
+            logger.info(f"Configuration result on {device_name}: {output}")
+            return {
+                "status": "success",
+                "message": f"Configuration applied on {device_name}.",
+                "output": output,
+            }
+
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="configure")
+        logger.error(f"Error applying configuration: {e}", exc_info=True)
+        return {"status": "error", "error": f"Configuration error: {e}"}
+
+
+async def execute_learn_config_async(
+    device_name: str,
+    changes_only: bool = False,
+    since: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Learn device configuration (via 'show run brief').
+
+    Every fetch is recorded as a snapshot. With `changes_only`, only the
+    sections added, removed or modified since snapshot `since` (default:
+    the previous snapshot of this device) are returned.
+    """
+    try:
+        result = await _SCHEDULER.run(device_name, _execute_learn_config, device_name)
+        if result.get("status") == "error":
+            return result
+
+        config = result["output"]["raw_output"]
+        previous = _CONFIG_SNAPSHOTS.latest(device_name)
+        snapshot = _CONFIG_SNAPSHOTS.record(device_name, config)
+        result["snapshot_id"] = snapshot["id"]
+        result["hash"] = snapshot["hash"]
+        result["sections"] = len(snapshot["sections"])
+        if not changes_only:
+            return result
+
+        base = _CONFIG_SNAPSHOTS.get(device_name, since) if since else previous
+        if base is None:
+            result["note"] = (
+                f"Snapshot '{since}' is not known for {device_name}; full config returned."
+                if since else "No earlier snapshot for this device; full config returned."
+            )
+            return result
+
+        delta = ConfigSnapshots.diff(base, snapshot)
+        return {
+            "status": "completed_delta",
+            "device": device_name,
+            "snapshot_id": snapshot["id"],
+            "hash": snapshot["hash"],
+            "since": base["id"],
+            "unchanged": base["id"] == snapshot["id"],
+            "summary": {
+                "added": len(delta["added"]),
+                "removed": len(delta["removed"]),
+                "modified": len(delta["modified"]),
+                "sections": len(snapshot["sections"]),
+            },
+            "output": delta,
+        }
+    except Exception as e:
+        logger.error(f"Error in execute_learn_config_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Error learning config: {e}"}
+
+
+def _execute_learn_config(device_name: str) -> Dict[str, Any]:
+    """Synchronous helper for learning configuration."""
+    try:
+        with _POOL.session(device_name) as device:
+            logger.info(f"Learning configuration from {device_name}…")
+
+            device.enable()
+            raw_output = device.execute("show run brief")
+        cleaned_output = clean_output(raw_output)
+
+        logger.info(f"Successfully learned config from {device_name}")
+        return {
+            "status": "completed_raw",
+            "device": device_name,
+            "output": {"raw_output": cleaned_output},
+        }
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="learn_config")
+        logger.error(f"Error learning config: {e}", exc_info=True)
+        return {"status": "error", "error": f"Error learning config: {e}"}
+
+
+async def execute_learn_logging_async(
+    device_name: str,
+    cursor: Optional[str] = None,
+    reset: bool = False,
+) -> Dict[str, Any]:
+    """
+    Learn device logging.
+
+    Only entries newer than `cursor` are returned; without one, the
+    server's stored cursor for the device is used. `reset` drops the
+    stored cursor and returns the last LOG_INITIAL_LINES lines.
+    """
+    try:
+        if reset:
+            _LOG_CURSORS.reset(device_name)
+        state = _LOG_CURSORS.get(device_name)
+        since = cursor or (state["cursor"] if state else None)
+        if since:
+            parsed_cursor = parse_log_cursor(since)
+            lines = state["lines"] if state else LOG_MIN_LINES
+        else:
+            parsed_cursor, lines = None, LOG_INITIAL_LINES
+
+        result = await _SCHEDULER.run(
+            device_name, _execute_learn_logging, device_name, parsed_cursor, lines
+        )
+        if result.get("status") != "completed":
+            return result
+
+        entries = result["output"]["entries"]
+        next_cursor = result.pop("_next_cursor") or since
+        # Only incremental polls say anything about the device's log rate.
+        _LOG_CURSORS.update(device_name, next_cursor, len(entries) if since else 0)
+        result["cursor"] = next_cursor
+        result["since"] = since
+        if since and not entries:
+            result["note"] = (
+                f"No new log entries since {since}; pass reset=true for recent history."
+            )
+        return result
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+    except Exception as e:
+        logger.error(f"Error in execute_learn_logging_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Error learning logs: {e}"}
+
+
+def _execute_learn_logging(
+    device_name: str,
+    cursor: Optional[Dict[str, Any]] = None,
+    lines: int = LOG_INITIAL_LINES,
+) -> Dict[str, Any]:
+    """
+    Synchronous helper for learning logging. When the cursor is not inside
+    the fetched window, the window grows (up to LOG_MAX_LINES) and the
+    command is re-run on the same session.
+    """
+    try:
+        with _POOL.session(device_name) as device:
+            logger.info(f"Learning logging output from {device_name} (last {lines})…")
+
+            while True:
+                raw_output = device.execute(f"show logging last {lines}")
+                records = parse_log_lines(raw_output)
+                if cursor is None:
+                    new, found = records, True
+                    break
+                new, found = select_new_log_records(records, cursor)
+                window_full = len(raw_output.splitlines()) >= lines
+                if found or not window_full or lines >= LOG_MAX_LINES:
+                    break
+                lines = min(LOG_MAX_LINES, lines * 4)
+                logger.info(f"Log cursor not in window on {device_name}, widening to {lines}")
+
+        if not records and raw_output.strip() and cursor is None:
+            # Unrecognised log format: hand back the text as before.
+            return {
+                "status": "completed_raw",
+                "device": device_name,
+                "output": {"raw_output": clean_output(raw_output)},
+            }
+
+        severities: Dict[str, int] = {}
+        for record in new:
+            severities[str(record["severity"])] = severities.get(str(record["severity"]), 0) + 1
+
+        logger.info(f"Successfully learned {len(new)} log entries from {device_name}")
+        return {
+            "status": "completed",
+            "device": device_name,
+            "lines_fetched": lines,
+            "gap": not found,
+            "summary": {"entries": len(new), "by_severity": severities},
+            "output": {"entries": [{k: v for k, v in r.items() if k != "_raw"} for r in new]},
+            "_next_cursor": _log_record_cursor(records[-1]) if records else None,
+        }
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="learn_logging")
+        logger.error(f"Error learning logs: {e}", exc_info=True)
+        return {"status": "error", "error": f"Error learning logs: {e}"}
+
+
+async def run_ping_command_async(device_name: str, command: str) -> Dict[str, Any]:
+    """Execute a ping command on a device."""
+    try:
+        if not command.lower().strip().startswith("ping"):
+            return {"status": "error", "error": f"Command '{command}' is not a 'ping' command."}
+
+        result = await _SCHEDULER.run(device_name, _execute_ping, device_name, command)
+        return result
+    except Exception as e:
+        logger.error(f"Error in run_ping_command_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Ping execution error: {e}"}
+
+
+def _execute_ping(device_name: str, command: str) -> Dict[str, Any]:
+    """Synchronous helper for ping execution."""
+    try:
+        with _POOL.session(device_name) as device:
+            logger.info(f"Executing ping: '{command}' on {device_name}")
+            return _parse_or_execute(device, device_name, command)
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="ping")
+        logger.error(f"Error executing ping: {e}", exc_info=True)
+        return {"status": "error", "error": f"Ping execution error: {e}"}
+
+
+PING_SWEEP_MAX_TARGETS = _env_int("PYATS_PING_SWEEP_MAX_TARGETS", 256)
+
+_PING_TARGET_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9.:\-]*$")
+# IOS / IOS-XE
+_IOS_PING_RE = re.compile(
+    r"Success rate is (?P<pct>\d+) percent \((?P<recv>\d+)/(?P<sent>\d+)\)"
+    r"(?:, round-trip min/avg/max = (?P<min>[\d.]+)/(?P<avg>[\d.]+)/(?P<max>[\d.]+) ms)?"
+)
+# NX-OS and Linux iputils
+_COUNT_PING_RE = re.compile(r"(?P<sent>\d+) packets transmitted, (?P<recv>\d+) (?:packets )?received")
+_RTT_PING_RE = re.compile(r"(?:round-trip|rtt) min/avg/max(?:/mdev)? = (?P<min>[\d.]+)/(?P<avg>[\d.]+)/(?P<max>[\d.]+)")
+
+
+def expand_ping_targets(targets: List[str]) -> List[str]:
+    """
+    Expand addresses, hostnames and CIDR blocks (host addresses only)
+    into a de-duplicated list. Raises ValueError above PING_SWEEP_MAX_TARGETS.
+    """
+    expanded: List[str] = []
+    for target in targets:
+        target = target.strip()
+        if not target:
+            continue
+        if "/" in target:
+            try:
+                network = ipaddress.ip_network(target, strict=False)
+            except ValueError:
+                raise ValueError(f"Invalid CIDR target '{target}'")
+            if network.num_addresses > PING_SWEEP_MAX_TARGETS + 2:
+                raise ValueError(
+                    f"{target} has {network.num_addresses} addresses; the sweep limit is {PING_SWEEP_MAX_TARGETS}"
+                )
+            hosts = list(network.hosts()) or [network.network_address]
+            expanded.extend(str(host) for host in hosts)
+        elif _PING_TARGET_RE.match(target):
+            expanded.append(target)
+        else:
+            raise ValueError(f"Invalid ping target '{target}'")
+    expanded = list(dict.fromkeys(expanded))
+    if len(expanded) > PING_SWEEP_MAX_TARGETS:
+        raise ValueError(f"{len(expanded)} targets exceed the sweep limit of {PING_SWEEP_MAX_TARGETS}")
+    return expanded
+
+
+def _ping_command(os_name: str, target: str, repeat: int, size: Optional[int], timeout: int) -> str:
+    if os_name == "linux":
+        return f"ping -c {repeat} -W {timeout}" + (f" -s {size}" if size else "") + f" {target}"
+    if os_name == "nxos":
+        return f"ping {target} count {repeat} timeout {timeout}" + (f" packet-size {size}" if size else "")
+    return f"ping {target} repeat {repeat} timeout {timeout}" + (f" size {size}" if size else "")
+
+
+def parse_ping_output(output: str) -> Optional[Dict[str, Any]]:
+    """Sent/received counts and min/avg/max RTT (ms) from IOS, NX-OS or Linux ping output."""
+    match = _IOS_PING_RE.search(output)
+    rtt = match
+    if match is None:
+        match = _COUNT_PING_RE.search(output)
+        rtt = _RTT_PING_RE.search(output)
+    if match is None:
+        return None
+    sent, received = int(match.group("sent")), int(match.group("recv"))
+    row: Dict[str, Any] = {
+        "sent": sent,
+        "received": received,
+        "success_pct": round(100 * received / sent) if sent else 0,
+        "min_ms": None,
+        "avg_ms": None,
+        "max_ms": None,
+    }
+    if rtt is not None and rtt.group("avg") is not None:
+        row.update(
+            min_ms=float(rtt.group("min")), avg_ms=float(rtt.group("avg")), max_ms=float(rtt.group("max"))
+        )
+    return row
+
+
+def summarize_ping_sweep(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    parsed = [r for r in rows if "sent" in r]
+    sent = sum(r["sent"] for r in parsed)
+    received = sum(r["received"] for r in parsed)
+    averages = [r["avg_ms"] for r in parsed if r["avg_ms"] is not None]
+    summary: Dict[str, Any] = {
+        "targets": len(rows),
+        "reachable": sum(1 for r in parsed if r["received"] == r["sent"] and r["sent"]),
+        "partial": sum(1 for r in parsed if 0 < r["received"] < r["sent"]),
+        "unreachable": sum(1 for r in parsed if r["received"] == 0),
+        "errors": len(rows) - len(parsed),
+        "success_pct": round(100 * received / sent, 1) if sent else 0.0,
+    }
+    if averages:
+        summary["rtt_avg_ms"] = {
+            "mean": round(statistics.fmean(averages), 2),
+            "median": round(statistics.median(averages), 2),
+            "p95": round(statistics.quantiles(averages, n=20)[18], 2) if len(averages) > 1 else averages[0],
+            "stdev": round(statistics.pstdev(averages), 2),
+        }
+        slowest = max((r for r in parsed if r["max_ms"] is not None), key=lambda r: r["max_ms"])
+        summary["slowest"] = {"target": slowest["target"], "max_ms": slowest["max_ms"]}
+    return summary
+
+
+async def run_ping_sweep_async(
+    device_name: str,
+    targets: List[str],
+    repeat: int = 5,
+    size: Optional[int] = None,
+    timeout: int = 1,
+) -> Dict[str, Any]:
+    """Ping many targets from one device over a single session."""
+    try:
+        addresses = expand_ping_targets(targets)
+        if not addresses:
+            return {"status": "error", "error": "No ping targets given."}
+        repeat = min(max(1, repeat), 100)
+        timeout = min(max(1, timeout), 10)
+        if size is not None and not 36 <= size <= 18024:
+            return {"status": "error", "error": "size must be between 36 and 18024 bytes"}
+
+        started = time.monotonic()
+        rows = await _SCHEDULER.run(
+            device_name, _execute_ping_sweep, device_name, addresses, repeat, size, timeout
+        )
+        failed = sum(1 for r in rows if r["status"] == "error")
+        return {
+            "status": "completed" if not failed else ("partial" if failed < len(rows) else "error"),
+            "device": device_name,
+            "summary": {
+                **summarize_ping_sweep(rows),
+                "repeat": repeat,
+                "size": size,
+                "elapsed_ms": round((time.monotonic() - started) * 1000),
+            },
+            "results": rows,
+        }
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
+    except Exception as e:
+        logger.error(f"Error in run_ping_sweep_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Ping sweep error: {e}"}
+
+
+def _execute_ping_sweep(
+    device_name: str, targets: List[str], repeat: int, size: Optional[int], timeout: int
+) -> List[Dict[str, Any]]:
+    """
+    Synchronous helper: ping each target back to back on one pooled
+    session. After a session failure the remaining targets are skipped.
+    """
+    rows: List[Dict[str, Any]] = []
+    try:
+        with _POOL.session(device_name) as device:
+            os_name = getattr(device, "os", "") or ""
+            for target in targets:
+                command = _ping_command(os_name, target, repeat, size, timeout)
+                try:
+                    output = device.execute(command, timeout=repeat * (timeout + 1) + 30)
+                except Exception as e:
+                    # unicon raises on a non-zero exit (e.g. Linux ping to a dead host)
+                    output = str(getattr(e, "output", "") or e)
+                    if parse_ping_output(output) is None and not device.is_connected():
+                        raise
+                row = parse_ping_output(output)
+                if row is None:
+                    rows.append({"target": target, "status": "error", "error": clean_output(output)[-200:]})
+                else:
+                    row["status"] = "ok" if row["received"] == row["sent"] else (
+                        "partial" if row["received"] else "unreachable"
+                    )
+                    rows.append({"target": target, **row})
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="ping")
+        logger.error(f"Error executing ping sweep: {e}", exc_info=True)
+        rows.extend(
+            {"target": t, "status": "error", "error": f"Not run: {e}"} for t in targets[len(rows):]
+        )
+    return rows
+
+
+LINUX_COMMAND_TIMEOUT = _env_int("PYATS_LINUX_COMMAND_TIMEOUT", 60)
+LINUX_FRAMED = _env_int("PYATS_LINUX_FRAMED", 1)
+
+
+class ShellCommandTimeout(Exception):
+    pass
+
+
+def _frame_marker(name: str, token: str, status: bool = False) -> tuple:
+    """
+    A marker and a printf that prints it on its own line (with ":<$?>"
+    when `status`). The printf splits the marker in two, so the echoed
+    command line never contains the marker itself.
+    """
+    marker = f"__PYATS_{name}_{token}__"
+    if status:
+        return marker, f"printf '%s%s:%s\\n' '{marker[:9]}' '{marker[9:]}' \"$?\""
+    return marker, f"printf '%s%s\\n' '{marker[:9]}' '{marker[9:]}'"
+
+
+def _framed_shell_execute(device, command: str, timeout: int) -> tuple:
+    """
+    Run `command` in the device's interactive shell and return (output,
+    exit status). The output is cut between begin/end markers printed by
+    the shell, so no prompt matching is involved. On timeout the command
+    is interrupted with Ctrl-C and the shell is resynchronized before
+    ShellCommandTimeout is raised.
+
+    Output is read as it arrives and sanitized chunk by chunk, so
+    unicon's spawn buffer never holds more than one read.
+    """
+    token = os.urandom(6).hex()
+    begin, print_begin = _frame_marker("BEGIN", token)
+    end, print_end = _frame_marker("END", token, status=True)
+    # eval keeps a trailing "# comment" or "&&" in the command from
+    # swallowing the end marker, and still runs in the session's shell.
+    device.sendline(f"{print_begin}; eval {shlex.quote(command)}; {print_end}")
+
+    end_re = re.compile(re.escape(end) + r":\d+\r?\n")
+    overlap = len(end) + 24
+    sanitizer = OutputSanitizer()
+    parts: List[str] = []
+    tail = ""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        # Each match consumes (and trims) whatever the spawn has buffered.
+        if remaining <= 0 or not device.receive(r"[\s\S]+", timeout=remaining, search_size=0):
+            sync, print_sync = _frame_marker("SYNC", token)
+            device.send("\x03")
+            device.sendline(print_sync)
+            if not device.receive(re.escape(sync), timeout=10):
+                raise SessionUnusable("Shell did not recover after Ctrl-C")
+            raise ShellCommandTimeout(f"Command timed out after {timeout}s and was interrupted (Ctrl-C)")
+        chunk = sanitizer.feed(device.receive_buffer())
+        parts.append(chunk)
+        # The end marker may straddle two reads.
+        window = tail + chunk
+        if end_re.search(window):
+            break
+        tail = window[-overlap:]
+    parts.append(sanitizer.flush())
+
+    text = "".join(parts).replace("\r\n", "\n").replace("\r", "")
+    match = re.search(re.escape(begin) + r"\n(.*?)" + re.escape(end) + r":(\d+)", text, re.S)
+    if match is None:
+        raise SessionUnusable("Could not find command output between shell markers")
+    output = match.group(1)
+    if output.endswith("\n"):
+        output = output[:-1]
+    return output, int(match.group(2))
+
+
+async def run_linux_command_async(
+    device_name: str,
+    command: str,
+    timeout: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Execute a Linux command on a device, through the asyncssh transport
+    when the device selects it, otherwise through unicon.
+    """
+    try:
+        await _refresh_testbed_async()
+        if linux_transport(device_name) == "asyncssh":
+            return await _run_linux_command_asyncssh(
+                device_name, command, timeout or LINUX_COMMAND_TIMEOUT
+            )
+        result = await _SCHEDULER.run(
+            device_name, _execute_linux_command, device_name, command, timeout or LINUX_COMMAND_TIMEOUT
+        )
+        return result
+    except Exception as e:
+        logger.error(f"Error in run_linux_command_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"Linux command execution error: {e}"}
+
+
+def _execute_linux_command(
+    device_name: str,
+    command: str,
+    timeout: int = LINUX_COMMAND_TIMEOUT,
+) -> Dict[str, Any]:
+    """
+    Synchronous helper for Linux command execution.
+
+    The command runs in the pooled (warm) shell with framed output; a
+    Genie parser, when one exists, is applied to that output locally.
+    """
+    try:
+        with _POOL.session(device_name) as device:
+            if not LINUX_FRAMED or not hasattr(device, "receive"):
+                return _execute_linux_command_unframed(device, device_name, command)
+
+            logger.info(f"Running '{command}' on {device_name} (timeout {timeout}s)")
+            try:
+                raw_output, exit_status = _framed_shell_execute(device, command, timeout)
+            except ShellCommandTimeout as e:
+                return {"status": "error", "device": device_name, "error": str(e)}
+
+        output: Any = raw_output
+        if _PARSERS.should_parse(device, command):
+            try:
+                output = device.parse(command, output=raw_output)
+            except Exception as e:
+                _PARSERS.record_failure(device, command, e, live=False)
+                logger.warning(f"Parsing failed for command: {command}. Returning raw output. Error: {e}")
+
+        return {
+            "status": "completed",
+            "device": device_name,
+            "exit_status": exit_status,
+            "output": output,
+        }
     except Exception as e:
-        logger.error(f"Error in apply_device_configuration_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Configuration error: {e}"}
+        _METRICS.inc("pyats_errors_total", stage="linux")
+        logger.error(f"Error executing Linux command: {e}", exc_info=True)
+        return {"status": "error", "error": str(e)}
 
 
-def _execute_config(device_name: str, config_commands: str) -> Dict[str, Any]:
-    """Synchronous helper for configuration application."""
-    device = None
-    try:
-        device = _get_device(device_name)
+def _execute_linux_command_unframed(device, device_name: str, command: str) -> Dict[str, Any]:
+    """unicon `execute`/`parse` path, used when framing is disabled."""
+    if ">" in command or "|" in command:
+        logger.info(f"Detected redirection or pipe in command: {command}")
+        command = f'sh -c "{command}"'
+
+    output = None
+    if _PARSERS.should_parse(device, command):
+        try:
+            logger.info(f"Parsing output for command: {command}")
+            output = device.parse(command)
+        except Exception as e:
+            _PARSERS.record_failure(device, command, e)
+            logger.warning(
+                f"Parsing failed for command: {command}. Using `execute` instead. Error: {e}"
+            )
+    if output is None:
+        output = device.execute(command)
+    return {"status": "completed", "device": device_name, "output": output}
+
+
+# ================================================================
+# ASYNCSSH LINUX TRANSPORT (optional)
+# ================================================================
+# Linux hosts can bypass unicon and its worker thread: with
+# `custom: {transport: asyncssh}` on the device, or PYATS_LINUX_TRANSPORT=asyncssh
+# for every linux host, commands run as SSH exec channels on the event loop.
+# Needs `pip install asyncssh`. Exec channels do not share shell state.
+LINUX_TRANSPORT = os.getenv("PYATS_LINUX_TRANSPORT", "unicon").strip().lower()
+ASYNCSSH_MAX_CHANNELS = _env_int("PYATS_ASYNCSSH_MAX_CHANNELS", 8)
+# None = do not verify host keys, like the testbed's unicon SSH sessions.
+ASYNCSSH_KNOWN_HOSTS = os.getenv("PYATS_ASYNCSSH_KNOWN_HOSTS", "").strip() or None
+
+
+async def _refresh_testbed_async() -> None:
+    """
+    Reload the testbed in a worker thread if the file changed. Afterwards
+    the loaded snapshot can be read with refresh=False without touching
+    the TestbedCache lock or running loader.load() on the event loop.
+    """
+    if _TESTBED.stale():
+        await asyncio.to_thread(_TESTBED.refresh)
+
+
+def linux_transport(device_name: str) -> str:
+    """
+    'asyncssh' or 'unicon' for a device, from its entry in the loaded
+    testbed (see _refresh_testbed_async).
+    """
+    raw = _TESTBED.raw_device(device_name, refresh=False)
+    if str(raw.get("os", "")).lower() != "linux":
+        return "unicon"
+    custom = raw.get("custom") or {}
+    return str(custom.get("transport") or LINUX_TRANSPORT).strip().lower()
 
-        cleaned_config = textwrap.dedent(config_commands.strip())
-        if not cleaned_config:
-            return {"status": "error", "error": "Empty configuration provided."}
 
-        logger.info(f"Applying configuration on {device_name}:\n{cleaned_config}")
-        output = device.configure(cleaned_config)
-        logger.info(f"Configuration result on {device_name}: {output}")
+def _ssh_params(device) -> Dict[str, Any]:
+    """asyncssh.connect() arguments from a testbed Device."""
+    connections = device.connections
+    name = "cli" if "cli" in connections else next(
+        (n for n in connections if connections[n].get("ip")), None
+    )
+    if name is None or not connections[name].get("ip"):
+        raise ValueError(f"Device '{device.name}' has no connection with an ip")
+    connection = connections[name]
+    credentials = device.credentials.get("default") or {}
+    password = credentials.get("password")
+    return {
+        "host": str(connection["ip"]),
+        "port": int(connection.get("port") or 22),
+        "username": credentials.get("username"),
+        "password": getattr(password, "plaintext", password),
+        "known_hosts": ASYNCSSH_KNOWN_HOSTS,
+    }
+
+
+class AsyncSSHPool:
+    """
+    One multiplexed SSH connection per host, with at most
+    ASYNCSSH_MAX_CHANNELS exec channels open on it at a time. Must be used
+    from a single event loop.
+    """
+
+    def __init__(self):
+        self._connections: Dict[str, Any] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._channels: Dict[str, asyncio.Semaphore] = {}
+        self._counters = {"connects": 0, "commands": 0, "timeouts": 0, "errors": 0}
+
+    async def _connection(self, device_name: str):
+        async with self._locks.setdefault(device_name, asyncio.Lock()):
+            connection = self._connections.get(device_name)
+            if connection is not None and not connection.is_closed():
+                return connection
+            asyncssh = _lazy_import("asyncssh")
+            params = _ssh_params(_TESTBED.device(device_name, refresh=False))
+            logger.info(f"🔌 Connecting to {device_name} via asyncssh…")
+            with _METRICS.timer("pyats_stage_seconds", stage="connect"):
+                connection = await asyncssh.connect(**params)
+            self._connections[device_name] = connection
+            self._counters["connects"] += 1
+            _METRICS.inc("pyats_connections_total", result="new")
+            return connection
+
+    async def run(self, device_name: str, command: str, timeout: float):
+        """Run `command`; returns asyncssh's SSHCompletedProcess."""
+        channels = self._channels.setdefault(device_name, asyncio.Semaphore(ASYNCSSH_MAX_CHANNELS))
+        async with channels:
+            connection = await self._connection(device_name)
+            self._counters["commands"] += 1
+            try:
+                with _METRICS.timer("pyats_stage_seconds", stage="ssh_exec"):
+                    return await connection.run(command, check=False, timeout=timeout)
+            except asyncio.TimeoutError:
+                self._counters["timeouts"] += 1
+                raise
+            except Exception:
+                # Drop the connection so the next command reconnects.
+                self._counters["errors"] += 1
+                self._connections.pop(device_name, None)
+                connection.close()
+                raise
+
+    async def close_all(self) -> None:
+        connections, self._connections = list(self._connections.values()), {}
+        for connection in connections:
+            connection.close()
+        for connection in connections:
+            await connection.wait_closed()
+
+    def stats(self) -> Dict[str, Any]:
         return {
-            "status": "success",
-            "message": f"Configuration applied on {device_name}.",
-            "output": output,
+            "connections": sum(1 for c in self._connections.values() if not c.is_closed()),
+            **self._counters,
         }
 
-    except Exception as e:
-        logger.error(f"Error applying configuration: {e}", exc_info=True)
-        return {"status": "error", "error": f"Configuration error: {e}"}
-    finally:
-        _disconnect_device(device)
 
+_ASYNCSSH = AsyncSSHPool()
 
-async def execute_learn_config_async(device_name: str) -> Dict[str, Any]:
-    """Learn device configuration (via 'show run brief')."""
+
+def _parse_linux_output(device_name: str, command: str, raw_output: str) -> Any:
+    device = _lookup_device(device_name)
+    if not _PARSERS.should_parse(device, command):
+        return raw_output
     try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_learn_config, device_name)
-        )
-        return result
+        return device.parse(command, output=raw_output)
     except Exception as e:
-        logger.error(f"Error in execute_learn_config_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Error learning config: {e}"}
+        _PARSERS.record_failure(device, command, e, live=False)
+        logger.warning(f"Parsing failed for command: {command}. Returning raw output. Error: {e}")
+        return raw_output
 
 
-def _execute_learn_config(device_name: str) -> Dict[str, Any]:
-    """Synchronous helper for learning configuration."""
-    device = None
+async def _run_linux_command_asyncssh(device_name: str, command: str, timeout: float) -> Dict[str, Any]:
     try:
-        device = _get_device(device_name)
-        logger.info(f"Learning configuration from {device_name}…")
+        completed = await _ASYNCSSH.run(device_name, command, timeout)
+    except asyncio.TimeoutError:
+        return {"status": "error", "device": device_name, "error": f"Command timed out after {timeout}s"}
+    except Exception as e:
+        _METRICS.inc("pyats_errors_total", stage="linux")
+        logger.error(f"Error executing Linux command via asyncssh: {e}", exc_info=True)
+        return {"status": "error", "error": str(e)}
 
-        device.enable()
-        raw_output = device.execute("show run brief")
-        cleaned_output = clean_output(raw_output)
+    raw_output = clean_output(completed.stdout or "")
+    if raw_output.endswith("\n"):
+        # Same shape as the framed unicon output.
+        raw_output = raw_output[:-1]
+    # Parser lookup and parsing are CPU-bound Genie work, so they run off the
+    # event loop; the SSH channels themselves never need a thread.
+    output = await asyncio.to_thread(_parse_linux_output, device_name, command, raw_output)
 
-        logger.info(f"Successfully learned config from {device_name}")
+    result = {
+        "status": "completed",
+        "device": device_name,
+        "exit_status": completed.exit_status,
+        "output": output,
+    }
+    if completed.stderr:
+        result["stderr"] = clean_output(completed.stderr)
+    return result
+
+
+# ================================================================
+# BACKGROUND COLLECTOR
+# ================================================================
+# Optional: set PYATS_COLLECTOR_CONFIG to a YAML file such as
+#
+#   interval: 300          # default seconds between rounds
+#   jitter: 0.2            # +/- fraction applied to every interval
+#   concurrency: 4         # devices polled at the same time
+#   collect:
+#     - devices: [router]  # names, testbed groups or "all"
+#       commands: ["show ip interface brief", "show ip ospf neighbor"]
+#       interval: 120
+COLLECTOR_CONFIG = os.getenv("PYATS_COLLECTOR_CONFIG", "").strip()
+
+
+class StateStore:
+    """
+    Latest collector result per (device, normalized command). Unlike the
+    result cache nothing is evicted; an entry is simply replaced by the
+    next collection round.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[tuple, tuple] = {}
+        self.hits = 0
+
+    def put(self, device_name: str, command: str, result: Dict[str, Any], fresh_for: float) -> None:
+        if result.get("status") not in ("completed", "completed_raw"):
+            return
+        key = (device_name, normalize_command(command))
+        with self._lock:
+            self._entries[key] = (time.monotonic(), time.time(), fresh_for, result)
+
+    def get(self, device_name: str, command: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        A copy of the collected result if it is younger than `max_age`, or
+        younger than its collection interval when `max_age` is None.
+        """
+        key = (device_name, normalize_command(command))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, collected_at, fresh_for, result = entry
+            age = time.monotonic() - stored_at
+            if age > (fresh_for if max_age is None else max_age):
+                return None
+            self.hits += 1
+        hit = dict(result)
+        hit["cache"] = {"hit": True, "age_s": round(age, 1), "source": "collector"}
+        return hit
+
+    def invalidate(self, device_name: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == device_name]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits}
+
+
+_STATE_STORE = StateStore()
+
+
+def load_collector_config(path: str) -> Dict[str, Any]:
+    """Read and validate the collector YAML. Raises ValueError on bad input."""
+    with open(path) as f:
+        config = _lazy_import("yaml").safe_load(f) or {}
+
+    default_interval = float(config.get("interval", 300))
+    jitter = float(config.get("jitter", 0.2))
+    if not 0 <= jitter < 1:
+        raise ValueError("collector jitter must be between 0 and 1")
+
+    jobs = []
+    for i, job in enumerate(config.get("collect") or [], 1):
+        devices = job.get("devices") or ["all"]
+        commands = job.get("commands") or []
+        if isinstance(devices, str):
+            devices = [devices]
+        if isinstance(commands, str):
+            commands = [commands]
+        for command in commands:
+            error = _check_show_command(command)
+            if error:
+                raise ValueError(f"collect entry {i}: {error}")
+        interval = float(job.get("interval", default_interval))
+        if not commands or interval <= 0:
+            raise ValueError(f"collect entry {i} needs commands and a positive interval")
+        jobs.append({
+            "name": job.get("name") or f"job{i}",
+            "devices": [str(d) for d in devices],
+            "commands": commands,
+            "interval": interval,
+        })
+    if not jobs:
+        raise ValueError(f"{path} has no 'collect' entries")
+
+    return {
+        "jitter": jitter,
+        "concurrency": max(1, int(config.get("concurrency", 4))),
+        "jobs": jobs,
+    }
+
+
+class Collector:
+    """
+    Polls the configured commands on a jittered schedule and keeps the
+    results in _STATE_STORE. Device work goes through _SCHEDULER, so a
+    collection never runs on a device at the same time as a tool call.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.jitter = config["jitter"]
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def _jittered(self, seconds: float) -> float:
+        return max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    async def run(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.config["concurrency"])
+        await asyncio.gather(*(self._run_job(job) for job in self.config["jobs"]))
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        # Spread the first round of every job across part of its interval.
+        delay = random.uniform(0, job["interval"] * max(self.jitter, 0.1))
+        state = self._jobs[job["name"]] = {
+            "rounds": 0, "failures": 0, "last_round_s": None, "last_round_at": None,
+        }
+        while True:
+            await asyncio.sleep(delay)
+            started = time.monotonic()
+            try:
+                selection = await asyncio.to_thread(_resolve_devices, job["devices"])
+                failures = await asyncio.gather(
+                    *(self._collect(job, name) for name in selection["devices"])
+                )
+                state["failures"] += sum(failures)
+            except Exception as e:
+                logger.warning(f"🛰️ Collector job {job['name']} failed: {e}")
+                state["failures"] += 1
+            elapsed = time.monotonic() - started
+            state["rounds"] += 1
+            state["last_round_s"] = round(elapsed, 1)
+            state["last_round_at"] = time.time()
+            delay = max(0.0, self._jittered(job["interval"]) - elapsed)
+
+    async def _collect(self, job: Dict[str, Any], device_name: str) -> int:
+        """Collect one device; returns the number of failed commands."""
+        async with self._semaphore:
+            results = await _SCHEDULER.run(
+                device_name, _execute_show_commands, device_name, job["commands"]
+            )
+        fresh_for = job["interval"] * (1 + self.jitter)
+        failed = 0
+        for command, result in zip(job["commands"], results):
+            _STATE_STORE.put(device_name, command, result, fresh_for)
+            _record_history(device_name, command, result)
+            ok = result.get("status") in ("completed", "completed_raw")
+            failed += not ok
+            _METRICS.inc("pyats_collector_commands_total", result="ok" if ok else "error")
+        return failed
+
+    def stats(self) -> Dict[str, Any]:
         return {
-            "status": "completed_raw",
-            "device": device_name,
-            "output": {"raw_output": cleaned_output},
+            "enabled": True,
+            "concurrency": self.config["concurrency"],
+            "jobs": {name: dict(state) for name, state in self._jobs.items()},
         }
-    except Exception as e:
-        logger.error(f"Error learning config: {e}", exc_info=True)
-        return {"status": "error", "error": f"Error learning config: {e}"}
+
+
+_COLLECTOR: Optional[Collector] = None
+
+
+@asynccontextmanager
+async def server_lifespan(server):
+    """
+    FastMCP lifespan: run the collector on the server's event loop and
+    close asyncssh connections (which live on that loop) at shutdown.
+    """
+    global _COLLECTOR
+    task = None
+    if COLLECTOR_CONFIG:
+        try:
+            _COLLECTOR = Collector(load_collector_config(COLLECTOR_CONFIG))
+        except Exception as e:
+            logger.error(f"❌ Collector disabled, cannot load {COLLECTOR_CONFIG}: {e}")
+        else:
+            task = asyncio.create_task(_COLLECTOR.run())
+            jobs = _COLLECTOR.config["jobs"]
+            logger.info(f"🛰️ Collector started with {len(jobs)} job(s) from {COLLECTOR_CONFIG}")
+    try:
+        yield {}
     finally:
-        _disconnect_device(device)
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await _ASYNCSSH.close_all()
+
+
+# ================================================================
+# SNAPSHOT HISTORY (SQLite + zlib, content-addressed)
+# ================================================================
+# Off unless PYATS_HISTORY_DB names a database file. Payloads are stored
+# once per distinct content (blobs, keyed by hash); `snapshots` holds one
+# row per change with the time range the payload was seen unchanged.
+HISTORY_DB = os.getenv("PYATS_HISTORY_DB", "").strip()
+HISTORY_RETENTION_DAYS = _env_float("PYATS_HISTORY_RETENTION_DAYS", 0.0)
+HISTORY_QUEUE_SIZE = _env_int("PYATS_HISTORY_QUEUE", 1000)
+
+_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    device TEXT NOT NULL,
+    command TEXT NOT NULL,
+    status TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES blobs(hash),
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_lookup ON snapshots (device, command, first_seen);
+CREATE INDEX IF NOT EXISTS snapshots_hash ON snapshots (hash);
+"""
+_HISTORY_PRUNE_EVERY = 3600.0
 
 
-async def execute_learn_logging_async(device_name: str) -> Dict[str, Any]:
-    """Learn device logging."""
+def parse_history_time(value: Optional[str]) -> float:
+    """
+    Epoch seconds for "now" (None), an epoch number, an ISO 8601 time
+    (local time when no offset is given) or a relative "-30m" / "-2h" / "-7d".
+    """
+    if value is None or not str(value).strip() or str(value).strip().lower() == "now":
+        return time.time()
+    value = str(value).strip()
+    relative = re.fullmatch(r"-?(\d+(?:\.\d+)?)\s*([smhd])(?:\s+ago)?", value)
+    if relative:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": 86400}[relative.group(2)]
+        return time.time() - float(relative.group(1)) * unit
     try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_learn_logging, device_name)
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"Cannot parse time '{value}'; use ISO 8601 (2024-05-01T10:00), epoch seconds or -2h/-7d"
         )
-        return result
-    except Exception as e:
-        logger.error(f"Error in execute_learn_logging_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Error learning logs: {e}"}
 
 
-def _execute_learn_logging(device_name: str) -> Dict[str, Any]:
-    """Synchronous helper for learning logging."""
-    device = None
-    try:
-        device = _get_device(device_name)
-        logger.info(f"Learning logging output from {device_name}…")
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts).astimezone().isoformat(timespec="seconds")
+
+
+class SnapshotHistory:
+    """
+    Writes parsed results to SQLite from a background thread, so tool
+    calls only pay for a queue put. Reads open their own connection.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: "queue.Queue" = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+        self._counters = {"written": 0, "changes": 0, "dropped": 0, "errors": 0}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Set when the database cannot be opened; history is then off.
+        self.error: Optional[str] = None
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[key] += n
 
-        raw_output = device.execute("show logging last 250")
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
 
-        logger.info(f"Successfully learned logs from {device_name}")
+    def record(self, device_name: str, command: str, result: Dict[str, Any]) -> None:
+        if self.error is not None or result.get("status") not in ("completed", "completed_raw"):
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="pyats-history", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(
+                (device_name, normalize_command(command), result["status"], result.get("output"), time.time())
+            )
+        except queue.Full:
+            self._count("dropped")
+
+    def _writer(self) -> None:
+        try:
+            conn = self._connect()
+            conn.executescript(_HISTORY_SCHEMA)
+        except Exception as e:
+            self.error = f"Cannot open history database {self.path}: {e}"
+            logger.error(f"{self.error}; snapshot history disabled")
+            self._discard_queued()
+            return
+        last_prune = 0.0
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            try:
+                self._write(conn, *item)
+                if HISTORY_RETENTION_DAYS > 0 and time.time() - last_prune > _HISTORY_PRUNE_EVERY:
+                    self.prune(conn)
+                    last_prune = time.time()
+            except Exception as e:
+                self._count("errors")
+                logger.warning(f"History write failed: {e}")
+        conn.close()
+
+    def _discard_queued(self) -> None:
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped += item is not None
+        self._count("dropped", dropped)
+
+    def _write(self, conn: sqlite3.Connection, device: str, command: str, status: str, output: Any, seen: float) -> None:
+        with _METRICS.timer("pyats_stage_seconds", stage="history_write"):
+            # Hash the JSON as it is produced; most writes are unchanged
+            # results that never need the payload itself.
+            hasher = hashlib.blake2b(digest_size=20)
+            size = 0
+            for chunk in iter_json_safe(output, sort_keys=True, separators=(",", ":")):
+                data = chunk.encode()
+                hasher.update(data)
+                size += len(data)
+            digest = hasher.hexdigest()
+            with conn:
+                latest = conn.execute(
+                    "SELECT id, hash FROM snapshots WHERE device = ? AND command = ? "
+                    "ORDER BY first_seen DESC LIMIT 1",
+                    (device, command),
+                ).fetchone()
+                if latest and latest[1] == digest:
+                    conn.execute("UPDATE snapshots SET last_seen = ? WHERE id = ?", (seen, latest[0]))
+                else:
+                    if conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+                        compressor = zlib.compressobj(6)
+                        parts = [
+                            compressor.compress(chunk.encode())
+                            for chunk in iter_json_safe(output, sort_keys=True, separators=(",", ":"))
+                        ]
+                        parts.append(compressor.flush())
+                        conn.execute(
+                            "INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                            (digest, b"".join(parts), size),
+                        )
+                    conn.execute(
+                        "INSERT INTO snapshots (device, command, status, hash, first_seen, last_seen) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (device, command, status, digest, seen, seen),
+                    )
+                    self._count("changes")
+        self._count("written")
+
+    def prune(self, conn: sqlite3.Connection) -> None:
+        cutoff = time.time() - HISTORY_RETENTION_DAYS * 86400
+        with conn:
+            removed = conn.execute("DELETE FROM snapshots WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM snapshots)")
+        if removed:
+            logger.info(f"🧹 History: pruned {removed} snapshot(s) older than {HISTORY_RETENTION_DAYS:g} days")
+
+    def lookup(self, device_name: str, command: str, at: float) -> Optional[Dict[str, Any]]:
+        """The snapshot of `command` on `device_name` that was current at time `at`."""
+        if not os.path.exists(self.path):
+            return None
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT s.status, s.hash, s.first_seen, s.last_seen, b.data, "
+                "(SELECT COUNT(*) FROM snapshots WHERE device = s.device AND command = s.command) "
+                "FROM snapshots s JOIN blobs b ON b.hash = s.hash "
+                "WHERE s.device = ? AND s.command = ? AND s.first_seen <= ? "
+                "ORDER BY s.first_seen DESC LIMIT 1",
+                (device_name, normalize_command(command), at),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        status, digest, first_seen, last_seen, data, versions = row
         return {
-            "status": "completed_raw",
+            "status": status,
             "device": device_name,
-            "output": {"raw_output": raw_output},
+            "command": command,
+            "snapshot": {
+                "first_seen": _iso(first_seen),
+                "last_seen": _iso(last_seen),
+                "hash": digest[:12],
+                "versions": versions,
+            },
+            "output": json.loads(zlib.decompress(data)),
         }
-    except Exception as e:
-        logger.error(f"Error learning logs: {e}", exc_info=True)
-        return {"status": "error", "error": f"Error learning logs: {e}"}
-    finally:
-        _disconnect_device(device)
 
+    def close(self, timeout: float = 10.0) -> None:
+        """Flush queued writes and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
 
-async def run_ping_command_async(device_name: str, command: str) -> Dict[str, Any]:
-    """Execute a ping command on a device."""
-    try:
-        if not command.lower().strip().startswith("ping"):
-            return {"status": "error", "error": f"Command '{command}' is not a 'ping' command."}
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        stats = {"path": self.path, "enabled": self.error is None, "queued": self._queue.qsize(), **counters}
+        if self.error is not None:
+            stats["error"] = self.error
+        return stats
 
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_ping, device_name, command)
-        )
-        return result
-    except Exception as e:
-        logger.error(f"Error in run_ping_command_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Ping execution error: {e}"}
 
+_HISTORY: Optional[SnapshotHistory] = SnapshotHistory(HISTORY_DB) if HISTORY_DB else None
 
-def _execute_ping(device_name: str, command: str) -> Dict[str, Any]:
-    """Synchronous helper for ping execution."""
-    device = None
-    try:
-        device = _get_device(device_name)
-        logger.info(f"Executing ping: '{command}' on {device_name}")
 
-        try:
-            parsed_output = device.parse(command)
-            logger.info(f"Parsed ping output for '{command}' on {device_name}")
-            return {"status": "completed", "device": device_name, "output": parsed_output}
-        except Exception as parse_exc:
-            logger.warning(
-                f"Parsing ping failed for '{command}' on {device_name}: {parse_exc}. "
-                "Falling back to execute."
-            )
-            raw_output = device.execute(command)
-            logger.info(f"Executed ping (fallback): '{command}' on {device_name}")
-            return {"status": "completed_raw", "device": device_name, "output": raw_output}
-    except Exception as e:
-        logger.error(f"Error executing ping: {e}", exc_info=True)
-        return {"status": "error", "error": f"Ping execution error: {e}"}
-    finally:
-        _disconnect_device(device)
+def _record_history(device_name: str, command: str, result: Dict[str, Any]) -> None:
+    if _HISTORY is not None:
+        _HISTORY.record(device_name, command, result)
 
 
-async def run_linux_command_async(device_name: str, command: str) -> Dict[str, Any]:
-    """Execute a Linux command on a device."""
+async def show_history_async(device_name: str, command: str, at: Optional[str] = None) -> Dict[str, Any]:
+    """Look up the stored snapshot for device/command current at `at`."""
+    if _HISTORY is None:
+        return {"status": "error", "error": "Snapshot history is disabled; set PYATS_HISTORY_DB to enable it."}
+    if _HISTORY.error is not None:
+        return {"status": "error", "error": f"Snapshot history is disabled: {_HISTORY.error}"}
     try:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, partial(_execute_linux_command, device_name, command)
-        )
-        return result
+        when = parse_history_time(at)
+        snapshot = await asyncio.to_thread(_HISTORY.lookup, device_name, command, when)
+    except ValueError as e:
+        return {"status": "error", "error": str(e)}
     except Exception as e:
-        logger.error(f"Error in run_linux_command_async: {e}", exc_info=True)
-        return {"status": "error", "error": f"Linux command execution error: {e}"}
+        logger.error(f"Error in show_history_async: {e}", exc_info=True)
+        return {"status": "error", "error": f"History lookup failed: {e}"}
+    if snapshot is None:
+        return {
+            "status": "error",
+            "error": f"No stored snapshot of '{command}' on {device_name} at or before {_iso(when)}",
+        }
+    return snapshot
 
 
-def _execute_linux_command(device_name: str, command: str) -> Dict[str, Any]:
-    """Synchronous helper for Linux command execution."""
-    device = None
-    try:
-        logger.info("Loading testbed…")
-        testbed = loader.load(TESTBED_PATH)
+# ================================================================
+# SERVER STATS
+# ================================================================
+METRICS_FILE = os.getenv("PYATS_METRICS_FILE")
+METRICS_INTERVAL = _env_float("PYATS_METRICS_INTERVAL", 60.0)
 
-        if device_name not in testbed.devices:
-            return {"status": "error", "error": f"Device '{device_name}' not found in testbed."}
 
-        device = testbed.devices[device_name]
+def collect_server_stats() -> Dict[str, Any]:
+    return {
+        "uptime_s": round(time.perf_counter() - _PROCESS_T0),
+        "metrics": _METRICS.snapshot(),
+        "pool": _POOL.stats(),
+        "scheduler": _SCHEDULER.stats(),
+        "result_cache": _RESULT_CACHE.stats(),
+        "parser_cache": _PARSERS.stats(),
+        "log_cursors": _LOG_CURSORS.stats(),
+        "result_handles": _RESULT_HANDLES.stats(),
+        "collector": _COLLECTOR.stats() if _COLLECTOR else {"enabled": False},
+        "state_store": _STATE_STORE.stats(),
+        "history": _HISTORY.stats() if _HISTORY else {"enabled": False},
+        "asyncssh": _ASYNCSSH.stats(),
+        "startup_ms": {stage: round(ms) for stage, ms in _STARTUP_TIMINGS.items()},
+    }
 
-        if not device.is_connected():
-            logger.info(f"Connecting to {device_name} via SSH…")
-            device.connect()
 
-        if ">" in command or "|" in command:
-            logger.info(f"Detected redirection or pipe in command: {command}")
-            command = f'sh -c "{command}"'
+def _component_gauges() -> Dict[str, float]:
+    gauges: Dict[str, float] = {}
+    for prefix, stats in (
+        ("pyats_pool", _POOL.stats()),
+        ("pyats_scheduler", _SCHEDULER.stats()),
+        ("pyats_result_cache", _RESULT_CACHE.stats()),
+        ("pyats_parser_cache", _PARSERS.stats()),
+        ("pyats_result_handles", _RESULT_HANDLES.stats()),
+    ):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f"{prefix}_{key}"] = value
+    return gauges
 
-        try:
-            parser = get_parser(command, device)
-            if parser:
-                logger.info(f"Parsing output for command: {command}")
-                output = device.parse(command)
-            else:
-                raise ValueError("No parser available")
-        except Exception as e:
-            logger.warning(
-                f"No parser found for command: {command}. Using `execute` instead. Error: {e}"
-            )
-            output = device.execute(command)
 
-        logger.info(f"Disconnecting from {device_name}…")
-        device.disconnect()
+def write_metrics_file(path: Optional[str] = None) -> Optional[str]:
+    """Write all metrics in Prometheus text format (atomically) if a path is configured."""
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    text = _METRICS.prometheus(_component_gauges())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return path
 
-        return {"status": "completed", "device": device_name, "output": output}
-    except Exception as e:
-        logger.error(f"Error executing Linux command: {e}", exc_info=True)
-        return {"status": "error", "error": str(e)}
-    finally:
-        if device and device.is_connected():
-            try:
-                device.disconnect()
-            except Exception:
-                pass
+
+def _metrics_writer_loop() -> None:
+    while True:
+        time.sleep(METRICS_INTERVAL)
+        try:
+            write_metrics_file()
+        except Exception as e:
+            logger.warning(f"Could not write metrics file {METRICS_FILE}: {e}")
 
 
 # ================================================================
 # MCP TOOLS (now all TOON-ified)
 # ================================================================
-mcp = FastMCP("pyATS Network Automation Server")
+mcp = FastMCP("pyATS Network Automation Server", lifespan=server_lifespan)
 
 
 @mcp.tool()
-async def pyats_run_show_command(device_name: str, command: str) -> str:
+async def pyats_run_show_command(
+    device_name: str,
+    command: str,
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+    select: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> str:
     """
     Execute a Cisco IOS/NX-OS 'show' command on a specified device.
+    Recent results are served from a server-side cache; `max_age` (seconds)
+    bounds how old a cached result may be and `force_refresh` bypasses it.
+    `select` keeps only the given dotted paths of the parsed output
+    (e.g. ["interface.*.status", "interface.*.ip_address"]); `where` keeps
+    only matching entries (e.g. "interface.*.status != up and interface.Gig*.protocol ~ down").
+    Operators: == != ~ !~ < <= > >=. Quote keys containing dots.
     Returns TOON + token savings.
     """
-    result = await run_show_command_async(device_name, command)
-    return toon_with_stats(result)
+    result = await run_show_command_async(
+        device_name, command, max_age, force_refresh, select, where
+    )
+    return await render_result(result)
 
 
 @mcp.tool()
-async def pyats_configure_device(device_name: str, config_commands: str) -> str:
+async def pyats_run_show_command_multi(
+    devices: List[str],
+    command: str,
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+    select: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> str:
+    """
+    Execute one 'show' command on several devices concurrently.
+    `devices` takes device names, testbed groups (e.g. "router", "iosxe")
+    or "all". Slow or unreachable devices time out individually.
+    `max_age` / `force_refresh` control the result cache per device;
+    `select` / `where` trim each device's parsed output as in
+    pyats_run_show_command.
+    Returns TOON + token savings.
+    """
+    result = await run_show_command_multi_async(
+        devices, command, max_concurrency, timeout, max_age, force_refresh, select, where
+    )
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_run_show_commands(
+    device_name: str,
+    commands: List[str],
+    max_age: Optional[float] = None,
+    force_refresh: bool = False,
+) -> str:
+    """
+    Execute several 'show' commands on one device in a single session.
+    Each command gets the usual safety checks and is parsed when possible;
+    the result lists per-command status and timing.
+    Returns TOON + token savings.
+    """
+    result = await run_show_commands_async(device_name, commands, max_age, force_refresh)
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_configure_device(device_name: str, config_commands: str, minimal: bool = False) -> str:
     """
     Apply configuration commands to a Cisco IOS/NX-OS device.
+    With `minimal=true`, lines already in the running config are skipped
+    and only missing/different lines are sent (write lines as they appear
+    in `show running-config`, indented under their parent).
+    Returns TOON + token savings.
+    """
+    result = await apply_device_configuration_async(device_name, config_commands, minimal)
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_configure_devices(
+    devices: List[str],
+    config_commands: str,
+    wave_size: Optional[int] = None,
+    max_failure_rate: Optional[float] = None,
+    timeout: Optional[float] = None,
+    minimal: bool = False,
+) -> str:
+    """
+    Apply the same configuration to several devices (names, testbed groups
+    or "all") in waves of `wave_size` devices configured in parallel.
+    If more than `max_failure_rate` (0-1) of a wave fails, later waves are
+    not started. `minimal=true` skips lines each device already has.
+    Returns per-device output, wave timings and a summary.
     Returns TOON + token savings.
     """
-    result = await apply_device_configuration_async(device_name, config_commands)
-    return toon_with_stats(result)
+    result = await apply_device_configuration_multi_async(
+        devices, config_commands, wave_size, max_failure_rate, timeout, minimal
+    )
+    return await render_result(result)
 
 
 @mcp.tool()
-async def pyats_show_running_config(device_name: str) -> str:
+async def pyats_show_running_config(
+    device_name: str,
+    changes_only: bool = False,
+    since: Optional[str] = None,
+) -> str:
     """
     Retrieve the running configuration from a Cisco IOS/NX-OS device.
+    Every result carries a `snapshot_id`. With `changes_only=true` only the
+    config sections added, removed or modified since snapshot `since`
+    (default: the previous retrieval) are returned.
     Returns TOON + token savings.
     """
-    result = await execute_learn_config_async(device_name)
-    return toon_with_stats(result)
+    result = await execute_learn_config_async(device_name, changes_only, since)
+    return await render_result(result)
 
 
 @mcp.tool()
-async def pyats_show_logging(device_name: str) -> str:
+async def pyats_show_logging(
+    device_name: str,
+    cursor: Optional[str] = None,
+    reset: bool = False,
+) -> str:
     """
-    Retrieve recent system logs from a Cisco IOS/NX-OS device.
+    Retrieve system logs from a Cisco IOS/NX-OS device as structured entries.
+    Only entries newer than `cursor` (a returned cursor, sequence number or
+    timestamp) are returned; without one the server continues from the
+    previous call. Pass `reset=true` for the recent history.
     Returns TOON + token savings.
     """
-    result = await execute_learn_logging_async(device_name)
-    return toon_with_stats(result)
+    result = await execute_learn_logging_async(device_name, cursor, reset)
+    return await render_result(result)
 
 
 @mcp.tool()
@@ -532,22 +4207,147 @@ async def pyats_ping_from_network_device(device_name: str, command: str) -> str:
     Returns TOON + token savings.
     """
     result = await run_ping_command_async(device_name, command)
-    return toon_with_stats(result)
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_ping_sweep(
+    device_name: str,
+    targets: List[str],
+    repeat: int = 5,
+    size: Optional[int] = None,
+    timeout: int = 1,
+) -> str:
+    """
+    Ping many targets from one device in a single session. `targets` takes
+    addresses, hostnames or CIDR blocks (e.g. "10.0.0.0/28"). Returns one
+    row per target (success %, min/avg/max RTT) plus sweep-wide stats.
+    Returns TOON + token savings.
+    """
+    result = await run_ping_sweep_async(device_name, targets, repeat, size, timeout)
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_run_linux_command(device_name: str, command: str, timeout: Optional[int] = None) -> str:
+    """
+    Execute a Linux command on a specified device. The shell session is kept
+    warm between calls; pipes and redirection work as in a normal shell.
+    A command running longer than `timeout` seconds is interrupted (Ctrl-C).
+    The result includes the command's `exit_status`.
+    Returns TOON + token savings.
+    """
+    result = await run_linux_command_async(device_name, command, timeout)
+    return await render_result(result)
+
+
+@mcp.tool()
+async def pyats_fetch_page(handle: str, offset: int = 0, limit: Optional[int] = None) -> str:
+    """
+    Fetch another page of a large result. Large tool results come back with
+    a `page` block holding a `handle`, the total entry count and
+    `next_offset`; pass those here. `limit` overrides the page size.
+    Returns TOON + token savings.
+    """
+    result = _RESULT_HANDLES.page(handle, offset, limit)
+    return await render_result(result, paginate=False)
+
+
+@mcp.tool()
+async def pyats_show_history(device_name: str, command: str, at: Optional[str] = None) -> str:
+    """
+    Return a stored snapshot of a show command's output as it was at time
+    `at` (ISO 8601, epoch seconds or relative like "-2h" / "-7d"; default
+    now) without contacting the device. Needs PYATS_HISTORY_DB.
+    Returns TOON + token savings.
+    """
+    result = await show_history_async(device_name, command, at)
+    return await render_result(result)
 
 
 @mcp.tool()
-async def pyats_run_linux_command(device_name: str, command: str) -> str:
+async def pyats_server_stats() -> str:
     """
-    Execute a Linux command on a specified device.
+    Report server internals: latency per stage (connect, queue wait, parse,
+    fallback/raw execute, normalize, TOON encode, tokenize), counters for
+    parse hits/fallbacks, connection reuse, cache hits and errors, in-flight
+    work per device, and pool/scheduler/cache sizes.
+    Also refreshes the Prometheus file when PYATS_METRICS_FILE is set.
     Returns TOON + token savings.
     """
-    result = await run_linux_command_async(device_name, command)
-    return toon_with_stats(result)
+    result = collect_server_stats()
+    try:
+        path = await asyncio.to_thread(write_metrics_file)
+        if path:
+            result["prometheus_file"] = path
+    except Exception as e:
+        result["prometheus_file_error"] = str(e)
+    return await render_result(result)
 
 
 # ================================================================
 # MAIN
 # ================================================================
+WARMUP_ENABLED = os.getenv("PYATS_WARMUP", "1").strip().lower() not in ("0", "false", "no")
+
+
+def _warm_up() -> None:
+    """
+    Load pyATS, Genie, the testbed and the tokenizer in the background
+    while the MCP handshake is served, then log where startup time went.
+    """
+    t0 = time.perf_counter()
+    for stage, fn in (
+        ("import pyats.topology.loader", lambda: _lazy_import("pyats.topology.loader")),
+        ("import genie.libs.parser.utils", lambda: _lazy_import("genie.libs.parser.utils")),
+        ("load testbed", _TESTBED.refresh),
+        ("load genie parser index", _warm_parser_index),
+        ("load tokenizer", _get_tokenizer if TOKEN_STATS_MODE != "off" else lambda: None),
+    ):
+        try:
+            _timed(stage, fn)
+        except Exception as e:
+            logger.error(f"Warm-up step '{stage}' failed, will retry on first use: {e}")
+    _STARTUP_TIMINGS["warm-up total"] = (time.perf_counter() - t0) * 1000
+    log_startup_report()
+
+
+def _warm_parser_index() -> None:
+    # Genie reads its parser index on the first get_parser() call.
+    get_parser = _lazy_import("genie.libs.parser.utils").get_parser
+    for device in _TESTBED.devices().values():
+        if device.os != "linux":
+            try:
+                get_parser("show version", device)
+            except Exception:
+                pass
+            return
+
+
+def log_startup_report() -> None:
+    lines = [f"  {stage:<32} {ms:>8.0f} ms" for stage, ms in _STARTUP_TIMINGS.items()]
+    logger.info("⏱️ Startup time breakdown:\n" + "\n".join(lines))
+
+
+def _handle_sigterm(signum, frame):
+    # Turn SIGTERM into a normal exit so the pool closes its sessions.
+    sys.exit(0)
+
+
 if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    _STARTUP_TIMINGS["ready for handshake"] = (time.perf_counter() - _PROCESS_T0) * 1000
+    if WARMUP_ENABLED:
+        threading.Thread(target=_warm_up, name="pyats-warmup", daemon=True).start()
+    else:
+        log_startup_report()
+    if METRICS_FILE:
+        threading.Thread(target=_metrics_writer_loop, name="pyats-metrics", daemon=True).start()
     logger.info("🚀 Starting pyATS FastMCP Server with TOON enabled…")
-    mcp.run()
+    try:
+        mcp.run()
+    finally:
+        _SCHEDULER.shutdown()
+        _POOL.close_all()
+        if _HISTORY is not None:
+            _HISTORY.close()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+SERVERS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVERS_DIR)
+os.environ.setdefault("PYATS_TESTBED_PATH", os.path.join(SERVERS_DIR, "testbed.yaml"))
@@ -0,0 +1,93 @@
+import time
+
+from server import ConfigSnapshots, split_config_sections
+
+CONFIG = """\
+Building configuration...
+
+Current configuration : 512 bytes
+!
+hostname R1
+!
+banner motd ^C
+Welcome
+! not a comment inside a banner
+^C
+!
+interface GigabitEthernet1
+ description uplink
+ ip address 10.0.0.1 255.255.255.0
+!
+router ospf 1
+ network 10.0.0.0 0.0.0.255 area 0
+!
+line vty 0 4
+ login local
+line vty 0 4
+ transport input ssh
+end
+"""
+
+
+def test_sections_own_their_indented_lines():
+    sections = split_config_sections(CONFIG)
+    assert sections["interface GigabitEthernet1"] == (
+        "interface GigabitEthernet1\n description uplink\n ip address 10.0.0.1 255.255.255.0"
+    )
+    assert sections["router ospf 1"] == "router ospf 1\n network 10.0.0.0 0.0.0.255 area 0"
+    assert sections["hostname R1"] == "hostname R1"
+
+
+def test_noise_and_comments_are_dropped():
+    keys = list(split_config_sections(CONFIG))
+    assert not any(k.startswith(("Building", "Current configuration", "!", "end")) for k in keys)
+
+
+def test_banner_is_kept_whole():
+    banner = split_config_sections(CONFIG)["banner motd ^C"]
+    assert banner == "banner motd ^C\nWelcome\n! not a comment inside a banner\n^C"
+
+
+def test_repeated_headers_get_unique_keys():
+    sections = split_config_sections(CONFIG)
+    assert sections["line vty 0 4"] == "line vty 0 4\n login local"
+    assert sections["line vty 0 4 #2"] == "line vty 0 4\n transport input ssh"
+
+
+def test_snapshot_id_is_a_content_hash():
+    snapshots = ConfigSnapshots()
+    first = snapshots.record("R1", CONFIG)
+    again = snapshots.record("R1", CONFIG.replace("Current configuration : 512", "Current configuration : 999"))
+    assert first["id"] == again["id"] == first["hash"][:12]
+    assert snapshots.get("R1", first["id"]) is again
+    assert snapshots.get("R1", first["hash"]) is again
+
+
+def test_only_the_last_snapshots_are_kept():
+    snapshots = ConfigSnapshots(per_device=2)
+    ids = [snapshots.record("R1", f"hostname R{i}\n")["id"] for i in range(3)]
+    assert snapshots.get("R1", ids[0]) is None
+    assert snapshots.latest("R1")["id"] == ids[2]
+
+
+def test_diff_reports_added_removed_and_modified():
+    snapshots = ConfigSnapshots()
+    old = snapshots.record("R1", CONFIG)
+    new = snapshots.record("R1", CONFIG.replace(" description uplink", " description core")
+                           .replace("router ospf 1\n network 10.0.0.0 0.0.0.255 area 0\n", "")
+                           + "ntp server 192.0.2.1\n")
+    diff = ConfigSnapshots.diff(old, new)
+    assert diff["added"] == {"ntp server 192.0.2.1": "ntp server 192.0.2.1"}
+    assert diff["removed"] == ["router ospf 1"]
+    assert list(diff["modified"]) == ["interface GigabitEthernet1"]
+
+
+def test_current_respects_age_and_config_changes():
+    snapshots = ConfigSnapshots()
+    snapshot = snapshots.record("R1", CONFIG)
+    assert snapshots.current("R1", max_age=60) is snapshot
+    assert snapshots.current("R1", max_age=-1) is None
+    time.sleep(0.01)
+    snapshots.mark_changed("R1")
+    assert snapshots.current("R1", max_age=60) is None
+    assert snapshots.current("R2", max_age=60) is None
@@ -0,0 +1,102 @@
+import io
+import json
+from collections import OrderedDict
+from enum import IntEnum
+
+import pytest
+
+import server
+from server import dump_json_safe, iter_json_safe, make_json_safe
+
+
+class Color(IntEnum):
+    RED = 1
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+        self.children = []
+        self.parent = None
+
+
+def cyclic():
+    root = Node("root")
+    child = Node("child")
+    child.parent = root
+    root.children.append(child)
+    return {"tree": root}
+
+
+class Slotted:
+    __slots__ = ("x",)
+
+    def __init__(self):
+        self.x = 1
+
+    def __str__(self):
+        return "slotted"
+
+
+CASES = [
+    None,
+    "plain",
+    42,
+    {},
+    [],
+    {"a": [1, 2.5, True, None, "x"], "b": {"c": {}}},
+    {1: "int key", (1, 2): "tuple key", None: "none key", "s": "str key"},
+    {1: "first", "1": "second"},
+    OrderedDict([("z", 1), ("a", 2)]),
+    {"t": (1, (2, 3)), "s": {3, 1, 2}, "mixed": {"b", 1}},
+    {"f": [float("nan"), float("inf"), float("-inf"), -0.0, 1e300]},
+    {"enum": Color.RED, "slotted": Slotted(), "bytes": b"\x00\xff"},
+    {"unicode": "café ☃ \"quoted\" \\ \n\t"},
+    cyclic(),
+    {"shared": [[1, 2]] * 3},
+    {f"route{i}": {"metric": i, "hops": [f"10.0.{i}.1"]} for i in range(3000)},
+]
+
+
+@pytest.mark.parametrize("obj", CASES)
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"sort_keys": True, "separators": (",", ":")},
+    {"ensure_ascii": False},
+])
+def test_matches_make_json_safe(obj, kwargs):
+    assert "".join(iter_json_safe(obj, **kwargs)) == json.dumps(make_json_safe(obj), **kwargs)
+
+
+def test_large_output_is_chunked():
+    data = {f"k{i}": list(range(5)) for i in range(5000)}
+    chunks = list(iter_json_safe(data))
+    assert len(chunks) > 1
+    assert json.loads("".join(chunks)) == data
+
+
+def test_deep_nesting_has_no_recursion_limit():
+    deep = current = {}
+    for _ in range(5000):
+        current["n"] = {}
+        current = current["n"]
+    text = "".join(iter_json_safe(deep))
+    assert text.count("{") == 5001
+
+
+def test_dump_writes_to_stream():
+    fp = io.StringIO()
+    dump_json_safe(cyclic(), fp, sort_keys=True)
+    assert fp.getvalue() == json.dumps(make_json_safe(cyclic()), sort_keys=True)
+
+
+def test_history_roundtrip(tmp_path):
+    history = server.SnapshotHistory(str(tmp_path / "history.sqlite"))
+    output = {"interfaces": {"Gi1": {"status": "up", "counters": (1, 2)}}}
+    history.record("R1", "show interfaces", {"status": "completed", "output": output})
+    history.record("R1", "show interfaces", {"status": "completed", "output": output})
+    history.close()
+    stats = history.stats()
+    assert (stats["written"], stats["changes"]) == (2, 1)
+    found = history.lookup("R1", "show interfaces", at=4102444800)
+    assert found["output"] == make_json_safe(output)
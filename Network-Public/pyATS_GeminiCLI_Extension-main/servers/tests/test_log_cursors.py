@@ -0,0 +1,119 @@
+import pytest
+
+from server import (
+    LOG_MAX_LINES,
+    LOG_MIN_LINES,
+    LogCursors,
+    _log_record_cursor,
+    parse_log_cursor,
+    parse_log_lines,
+    select_new_log_records,
+)
+
+IOS_LOG = """\
+Syslog logging: enabled (0 messages dropped)
+
+Log Buffer (8192 bytes):
+101: *Mar  1 10:15:00.123: %LINK-3-UPDOWN: Interface GigabitEthernet1, changed state to down
+102: *Mar  1 10:15:01.456: %LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet1, changed state to down
+103: *Mar  1 10:16:30.000: %SYS-5-CONFIG_I: Configured from console by admin on vty0
+ (10.0.0.5)
+"""
+
+UNSEQUENCED_LOG = """\
+2024 Mar  1 10:15:00 N9K %ETHPORT-5-IF_DOWN_LINK_FAILURE: Interface Ethernet1/1 is down
+2024 Mar  1 10:16:00 N9K %ETHPORT-5-IF_UP: Interface Ethernet1/1 is up
+2024 Mar  1 10:17:00 N9K %VSHD-5-VSHD_SYSLOG_CONFIG_I: Configured from vty by admin
+"""
+
+
+def test_parses_sequence_timestamp_and_fields():
+    records = parse_log_lines(IOS_LOG)
+    assert [r["seq"] for r in records] == [101, 102, 103]
+    first = records[0]
+    assert first["timestamp"] == "Mar  1 10:15:00.123"
+    assert (first["facility"], first["severity"], first["mnemonic"]) == ("LINK", 3, "UPDOWN")
+    assert first["message"].startswith("Interface GigabitEthernet1")
+
+
+def test_banner_is_dropped_and_continuations_are_joined():
+    records = parse_log_lines(IOS_LOG)
+    assert len(records) == 3
+    assert records[2]["message"].endswith("on vty0 (10.0.0.5)")
+
+
+def test_nxos_and_xr_formats():
+    nxos = parse_log_lines(UNSEQUENCED_LOG)
+    assert [r["mnemonic"] for r in nxos] == ["IF_DOWN_LINK_FAILURE", "IF_UP", "VSHD_SYSLOG_CONFIG_I"]
+    assert all(r["seq"] is None for r in nxos)
+    xr = parse_log_lines("RP/0/RP0/CPU0:Mar  1 10:15:00.000 UTC: ifmgr[123]: %PKT_INFRA-LINK-3-UPDOWN : Interface down")
+    assert xr[0]["facility"] == "PKT_INFRA-LINK"
+    assert xr[0]["message"] == "Interface down"
+
+
+def test_cursor_roundtrip():
+    records = parse_log_lines(IOS_LOG)
+    assert _log_record_cursor(records[0]) == "seq:101"
+    assert parse_log_cursor("seq:101") == {"seq": 101}
+    assert parse_log_cursor("101") == {"seq": 101}
+
+    unsequenced = parse_log_lines(UNSEQUENCED_LOG)[0]
+    cursor = parse_log_cursor(_log_record_cursor(unsequenced))
+    assert cursor["time"] == (3, 1, 36900.0)
+    assert len(cursor["hash"]) == 8
+    assert parse_log_cursor("Mar 1 10:15:00") == {"time": (3, 1, 36900.0), "hash": None}
+
+
+def test_bad_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        parse_log_cursor("yesterday")
+
+
+def test_select_by_sequence():
+    records = parse_log_lines(IOS_LOG)
+    new, found = select_new_log_records(records, {"seq": 101})
+    assert [r["seq"] for r in new] == [102, 103]
+    assert found
+    new, found = select_new_log_records(records, {"seq": 50})
+    assert len(new) == 3 and not found
+
+
+def test_select_by_sequence_keeps_unsequenced_lines_by_time():
+    records = parse_log_lines(
+        "101: *Mar  1 10:15:00.000: %LINK-3-UPDOWN: Interface Gi1, changed state to down\n"
+        "*Mar  1 10:14:00.000: %SYS-6-LOGGINGHOST_STARTSTOP: Logging to host 192.0.2.9 stopped\n"
+        "*Mar  1 10:15:30.000: %SYS-6-LOGGINGHOST_STARTSTOP: Logging to host 192.0.2.9 started\n"
+        "102: *Mar  1 10:16:00.000: %LINK-3-UPDOWN: Interface Gi1, changed state to up\n"
+    )
+    new, found = select_new_log_records(records, {"seq": 101})
+    assert [(r["seq"], r["timestamp"]) for r in new] == [
+        (None, "Mar  1 10:15:30.000"), (102, "Mar  1 10:16:00.000"),
+    ]
+    assert found
+
+
+def test_select_by_hash_then_time():
+    records = parse_log_lines(UNSEQUENCED_LOG)
+    cursor = parse_log_cursor(_log_record_cursor(records[0]))
+    new, found = select_new_log_records(records, cursor)
+    assert [r["mnemonic"] for r in new] == ["IF_UP", "VSHD_SYSLOG_CONFIG_I"] and found
+
+    # The anchor line rolled out of the buffer: fall back to its timestamp.
+    new, found = select_new_log_records(records[1:], {"time": cursor["time"], "hash": "00000000"})
+    assert [r["mnemonic"] for r in new] == ["IF_UP", "VSHD_SYSLOG_CONFIG_I"] and not found
+
+    new, found = select_new_log_records(records, parse_log_cursor("Mar 1 10:16:00"))
+    assert [r["mnemonic"] for r in new] == ["VSHD_SYSLOG_CONFIG_I"] and found
+
+
+def test_adaptive_fetch_size():
+    cursors = LogCursors()
+    assert cursors.get("R1") is None
+    cursors.update("R1", "seq:5", new_records=0)
+    assert cursors.get("R1") == {**cursors.get("R1"), "cursor": "seq:5", "lines": LOG_MIN_LINES}
+    cursors.update("R1", "seq:105", new_records=100)
+    assert cursors.get("R1")["lines"] == 200 + LOG_MIN_LINES
+    cursors.update("R1", "seq:99999", new_records=99894)
+    assert cursors.get("R1")["lines"] == LOG_MAX_LINES
+    cursors.reset("R1")
+    assert cursors.get("R1") is None
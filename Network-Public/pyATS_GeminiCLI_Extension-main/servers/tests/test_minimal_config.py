@@ -0,0 +1,122 @@
+from server import build_config_tree, minimal_config_lines
+
+RUNNING = """\
+Building configuration...
+
+Current configuration : 1234 bytes
+!
+hostname R1
+!
+no ip domain lookup
+ip routing
+!
+banner motd ^C
+Authorized access only
+^C
+!
+interface GigabitEthernet1
+ description uplink
+ ip address 10.0.0.1 255.255.255.0
+ no shutdown
+!
+interface GigabitEthernet2
+ shutdown
+!
+router ospf 1
+ router-id 1.1.1.1
+ network 10.0.0.0 0.0.0.255 area 0
+!
+logging host 192.0.2.10
+!
+end
+"""
+
+
+def test_tree_uses_indentation_and_drops_noise():
+    tree = build_config_tree(RUNNING)
+    assert "Building configuration..." not in tree
+    assert not any(key.startswith("Current configuration") for key in tree)
+    assert "end" not in tree
+    assert list(tree["interface GigabitEthernet1"]) == [
+        "description uplink", "ip address 10.0.0.1 255.255.255.0", "no shutdown",
+    ]
+    assert tree["router ospf 1"]["router-id 1.1.1.1"] == {}
+
+
+def test_tree_normalizes_whitespace():
+    tree = build_config_tree("interface  Gi1\n   ip   address 1.1.1.1 255.255.255.255\n")
+    assert list(tree["interface Gi1"]) == ["ip address 1.1.1.1 255.255.255.255"]
+
+
+def test_tree_keeps_banner_as_one_key():
+    tree = build_config_tree(RUNNING)
+    banners = [key for key in tree if key.startswith("banner motd")]
+    assert banners == ["banner motd ^C\nAuthorized access only\n^C"]
+    assert "Authorized access only" not in tree
+
+
+def test_tree_single_line_banner():
+    tree = build_config_tree("banner login #Keep out#\nhostname R1\n")
+    assert list(tree) == ["banner login #Keep out#", "hostname R1"]
+
+
+def test_nothing_sent_when_already_configured():
+    lines, intended = minimal_config_lines(
+        "hostname R1\ninterface GigabitEthernet1\n description uplink\n", RUNNING
+    )
+    assert lines == []
+    assert intended == 3
+
+
+def test_missing_child_resends_parent():
+    lines, _ = minimal_config_lines(
+        "interface GigabitEthernet1\n description uplink\n mtu 9000\n", RUNNING
+    )
+    assert lines == ["interface GigabitEthernet1", " mtu 9000"]
+
+
+def test_missing_section_sent_whole():
+    lines, intended = minimal_config_lines(
+        "router bgp 65000\n neighbor 10.0.0.2 remote-as 65001\n", RUNNING
+    )
+    assert lines == ["router bgp 65000", " neighbor 10.0.0.2 remote-as 65001"]
+    assert intended == 2
+
+
+def test_no_for_default_on_feature_is_sent():
+    # Neither "cdp run" nor "ip http server" is shown when on by default.
+    lines, _ = minimal_config_lines("no cdp run\nno ip http server\n", RUNNING)
+    assert lines == ["no cdp run", "no ip http server"]
+
+
+def test_no_already_in_running_is_skipped():
+    lines, _ = minimal_config_lines("no ip domain lookup\n", RUNNING)
+    assert lines == []
+
+
+def test_no_with_arguments():
+    lines, _ = minimal_config_lines(
+        "no logging host 192.0.2.10\nno logging host 198.51.100.7\n", RUNNING
+    )
+    assert lines == ["no logging host 192.0.2.10", "no logging host 198.51.100.7"]
+
+
+def test_nested_no_forms():
+    lines, _ = minimal_config_lines(
+        "interface GigabitEthernet1\n no shutdown\n"
+        "interface GigabitEthernet2\n no shutdown\n"
+        "router ospf 1\n no network 10.0.0.0 0.0.0.255 area 0\n",
+        RUNNING,
+    )
+    assert lines == [
+        "interface GigabitEthernet2", " no shutdown",
+        "router ospf 1", " no network 10.0.0.0 0.0.0.255 area 0",
+    ]
+
+
+def test_banner_compared_as_a_whole():
+    same, _ = minimal_config_lines("banner motd ^C\nAuthorized access only\n^C\n", RUNNING)
+    assert same == []
+    changed, intended = minimal_config_lines("banner motd ^C\nGo away\n^C\n", RUNNING)
+    assert changed == ["banner motd ^C\nGo away\n^C"]
+    assert intended == 1
@@ -0,0 +1,88 @@
+import copy
+
+import pytest
+
+from server import OutputProjection
+
+OUTPUT = {
+    "interface": {
+        "GigabitEthernet1": {"status": "up", "protocol": "up", "ip_address": "10.0.0.1", "mtu": 1500},
+        "GigabitEthernet2": {"status": "administratively down", "protocol": "down", "ip_address": "unassigned", "mtu": 1500},
+        "GigabitEthernet3": {"status": "up", "protocol": "down", "ip_address": "10.0.2.1", "mtu": 9000},
+        "Loopback0": {"status": "up", "protocol": "up", "ip_address": "1.1.1.1", "mtu": 1514},
+    },
+    "routes": {"10.0.0.0/24": {"active": True}},
+}
+
+
+def project(select=None, where=None, output=OUTPUT):
+    result = {"status": "completed", "device": "R1", "output": output}
+    return OutputProjection.compile(select, where).apply_to_result(result)
+
+
+def test_compile_without_arguments_is_none():
+    assert OutputProjection.compile(None, None) is None
+    assert OutputProjection.compile([], "  ") is None
+
+
+def test_select_keeps_only_the_given_paths():
+    result = project(select=["interface.*.status"])
+    assert result["output"] == {"interface": {name: {"status": v["status"]} for name, v in OUTPUT["interface"].items()}}
+
+
+def test_select_with_glob_segments_and_comma_string():
+    result = project(select="interface.Gig*.mtu,interface.Loopback0.ip_address")
+    assert result["output"]["interface"]["GigabitEthernet3"] == {"mtu": 9000}
+    assert result["output"]["interface"]["Loopback0"] == {"ip_address": "1.1.1.1"}
+
+
+def test_quoted_segment_with_dots():
+    result = project(select=['routes."10.0.0.0/24".active'])
+    assert result["output"] == {"routes": {"10.0.0.0/24": {"active": True}}}
+
+
+@pytest.mark.parametrize("where, expected", [
+    ("interface.*.status == up", ["GigabitEthernet1", "GigabitEthernet3", "Loopback0"]),
+    ("interface.*.protocol != up", ["GigabitEthernet2", "GigabitEthernet3"]),
+    ("interface.*.status ~ ^admin", ["GigabitEthernet2"]),
+    ("interface.*.ip_address !~ ^10\\.", ["GigabitEthernet2", "Loopback0"]),
+    ("interface.*.mtu > 1500", ["GigabitEthernet3", "Loopback0"]),
+    ("interface.*.mtu <= 1500", ["GigabitEthernet1", "GigabitEthernet2"]),
+    ("interface.Gig*.status == up and interface.Gig*.protocol == down", ["GigabitEthernet3", "Loopback0"]),
+])
+def test_where_filters_entries(where, expected):
+    assert sorted(project(where=where)["output"]["interface"]) == expected
+
+
+def test_where_and_select_combine():
+    result = project(select=["interface.*.ip_address"], where="interface.*.protocol == down")
+    assert result["output"] == {"interface": {
+        "GigabitEthernet2": {"ip_address": "unassigned"},
+        "GigabitEthernet3": {"ip_address": "10.0.2.1"},
+    }}
+
+
+def test_input_is_not_modified():
+    before = copy.deepcopy(OUTPUT)
+    project(select=["interface.*.status"], where="interface.*.status == up")
+    assert OUTPUT == before
+
+
+def test_nothing_matched_adds_a_note():
+    result = project(where="interface.*.status == testing", output={"interface": OUTPUT["interface"]})
+    assert result["output"] == {}
+    assert "matched nothing" in result["note"]
+    assert "matched nothing" in project(select=["vrf.*.name"])["note"]
+
+
+def test_raw_output_is_returned_with_a_note():
+    raw = {"status": "completed_raw", "output": "Gi1 up up"}
+    result = OutputProjection(select=["interface.*.status"]).apply_to_result(raw)
+    assert result["output"] == "Gi1 up up"
+    assert "parsed output only" in result["note"]
+
+
+@pytest.mark.parametrize("where", ["interface.status == up", "interface.*.status", "== up"])
+def test_bad_where_clause_is_rejected(where):
+    with pytest.raises(ValueError):
+        OutputProjection.compile(None, where)
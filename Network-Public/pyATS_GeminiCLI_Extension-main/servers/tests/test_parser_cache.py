@@ -0,0 +1,60 @@
+import pytest
+from genie.metaparser.util.exceptions import SchemaEmptyParserError
+from unicon.core.errors import EOF, SubCommandFailure, TimeoutError as UniconTimeout
+
+from server import ParserCache
+
+
+class FakeDevice:
+    name = "R1"
+    os = "iosxe"
+    platform = "cat9k"
+
+    def __init__(self, connected=True):
+        self.connected = connected
+
+    def is_connected(self):
+        return self.connected
+
+
+def known_state(cache, device, command):
+    entry = cache._entries.get(cache._key(device, command))
+    return entry and entry[0]
+
+
+@pytest.mark.parametrize("error", [
+    EOF("connection closed"),
+    UniconTimeout("timed out"),
+    SubCommandFailure("Command execution failed", UniconTimeout("timed out")),
+])
+def test_session_failures_are_not_parser_failures(error):
+    cache, device = ParserCache(), FakeDevice()
+    assert not cache.record_failure(device, "show version", error)
+    assert known_state(cache, device, "show version") is None
+
+
+def test_disconnected_device_is_not_a_parser_failure():
+    cache, device = ParserCache(), FakeDevice(connected=False)
+    assert not cache.record_failure(device, "show version", KeyError("version"))
+
+
+def test_empty_output_is_not_a_parser_failure():
+    cache, device = ParserCache(), FakeDevice()
+    error = SchemaEmptyParserError(data="")
+    assert not cache.record_failure(device, "show ip ospf neighbor", error)
+    assert not cache.record_failure(device, "show ip ospf neighbor", error, live=False)
+    assert known_state(cache, device, "show ip ospf neighbor") is None
+
+
+def test_parser_error_is_recorded():
+    cache, device = ParserCache(), FakeDevice()
+    assert cache.record_failure(device, "show version", KeyError("version"))
+    assert known_state(cache, device, "show version") == "failed"
+    assert not cache.should_parse(device, "show version")
+
+
+def test_offline_parse_ignores_session_state():
+    # Output parsed after the fact (output=...) says nothing about the session.
+    cache, device = ParserCache(), FakeDevice(connected=False)
+    assert cache.record_failure(device, "ls -l", ValueError("bad row"), live=False)
+    assert known_state(cache, device, "ls -l") == "failed"
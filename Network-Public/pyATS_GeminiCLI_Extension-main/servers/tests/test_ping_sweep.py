@@ -0,0 +1,96 @@
+import pytest
+
+import server
+from server import expand_ping_targets, parse_ping_output, summarize_ping_sweep
+
+IOS_OK = """\
+Type escape sequence to abort.
+Sending 5, 100-byte ICMP Echos to 10.0.0.2, timeout is 2 seconds:
+!!!!!
+Success rate is 100 percent (5/5), round-trip min/avg/max = 1/2/4 ms
+"""
+
+IOS_PARTIAL = "..!!!\nSuccess rate is 60 percent (3/5), round-trip min/avg/max = 10/12/15 ms\n"
+
+IOS_DOWN = ".....\nSuccess rate is 0 percent (0/5)\n"
+
+NXOS = """\
+--- 10.0.0.3 ping statistics ---
+5 packets transmitted, 4 packets received, 20.00% packet loss
+round-trip min/avg/max = 0.512/0.734/1.201 ms
+"""
+
+LINUX = """\
+--- 10.0.0.4 ping statistics ---
+3 packets transmitted, 3 received, 0% packet loss, time 2003ms
+rtt min/avg/max/mdev = 0.040/0.052/0.061/0.008 ms
+"""
+
+LINUX_DOWN = "3 packets transmitted, 0 received, 100% packet loss, time 2040ms\n"
+
+
+def test_ios_output():
+    assert parse_ping_output(IOS_OK) == {
+        "sent": 5, "received": 5, "success_pct": 100, "min_ms": 1.0, "avg_ms": 2.0, "max_ms": 4.0,
+    }
+    assert parse_ping_output(IOS_PARTIAL)["success_pct"] == 60
+
+
+def test_ios_output_without_replies_has_no_rtt():
+    row = parse_ping_output(IOS_DOWN)
+    assert (row["sent"], row["received"], row["avg_ms"]) == (5, 0, None)
+
+
+def test_nxos_output():
+    row = parse_ping_output(NXOS)
+    assert (row["sent"], row["received"], row["success_pct"]) == (5, 4, 80)
+    assert row["avg_ms"] == 0.734
+
+
+def test_linux_output():
+    row = parse_ping_output(LINUX)
+    assert (row["sent"], row["received"], row["min_ms"], row["max_ms"]) == (3, 3, 0.04, 0.061)
+    assert parse_ping_output(LINUX_DOWN)["received"] == 0
+
+
+def test_unrecognised_output():
+    assert parse_ping_output("% Unrecognized host or address") is None
+
+
+def test_expand_addresses_hostnames_and_cidr():
+    assert expand_ping_targets(["10.0.0.0/30", "core-sw1", "10.0.0.1", " "]) == [
+        "10.0.0.1", "10.0.0.2", "core-sw1",
+    ]
+    assert expand_ping_targets(["192.0.2.7/32"]) == ["192.0.2.7"]
+    assert expand_ping_targets(["2001:db8::/126"]) == ["2001:db8::1", "2001:db8::2", "2001:db8::3"]
+
+
+@pytest.mark.parametrize("targets", [["10.0.0.0/33"], ["bad target"], ["$(reboot)"]])
+def test_invalid_targets(targets):
+    with pytest.raises(ValueError):
+        expand_ping_targets(targets)
+
+
+def test_sweep_limit(monkeypatch):
+    monkeypatch.setattr(server, "PING_SWEEP_MAX_TARGETS", 4)
+    with pytest.raises(ValueError):
+        expand_ping_targets(["10.0.0.0/24"])
+    with pytest.raises(ValueError):
+        expand_ping_targets([f"host{i}" for i in range(5)])
+    assert len(expand_ping_targets(["10.0.0.0/30", "h1", "h2"])) == 4
+
+
+def test_summary():
+    rows = [
+        {"target": "a", **parse_ping_output(IOS_OK)},
+        {"target": "b", **parse_ping_output(IOS_PARTIAL)},
+        {"target": "c", **parse_ping_output(IOS_DOWN)},
+        {"target": "d", "error": "timed out"},
+    ]
+    summary = summarize_ping_sweep(rows)
+    assert {k: summary[k] for k in ("targets", "reachable", "partial", "unreachable", "errors")} == {
+        "targets": 4, "reachable": 1, "partial": 1, "unreachable": 1, "errors": 1,
+    }
+    assert summary["success_pct"] == round(100 * 8 / 15, 1)
+    assert summary["rtt_avg_ms"]["median"] == 7.0
+    assert summary["slowest"] == {"target": "b", "max_ms": 15.0}
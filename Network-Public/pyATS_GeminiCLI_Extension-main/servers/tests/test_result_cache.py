@@ -0,0 +1,23 @@
+from server import ResultCache, normalize_command
+
+
+def ok(output):
+    return {"status": "completed", "output": output}
+
+
+def test_normalize_keeps_case():
+    assert normalize_command("  show ip  access-lists   ACL_A ") == "show ip access-lists ACL_A"
+
+
+def test_case_sensitive_arguments_do_not_collide():
+    cache = ResultCache()
+    cache.put("R1", "show ip access-lists ACL_A", ok("upper"))
+    cache.put("R1", "show ip access-lists acl_a", ok("lower"))
+    assert cache.get("R1", "show ip access-lists ACL_A")["output"] == "upper"
+    assert cache.get("R1", "show  ip access-lists acl_a")["output"] == "lower"
+
+
+def test_ttl_rules_ignore_case():
+    cache = ResultCache()
+    assert cache.ttl_for("SHOW CLOCK") == 0
+    assert cache.ttl_for("Show Version") == 3600
@@ -0,0 +1,82 @@
+import server
+from server import PAGE_TARGET_BYTES, PAGE_THRESHOLD_BYTES, ResultHandles
+
+
+def test_small_result_is_returned_unchanged():
+    data = {"status": "completed", "output": {"a": 1}}
+    assert ResultHandles().first_page(data) is data
+
+
+def test_pages_over_the_largest_collection():
+    routes = {f"10.{i // 256}.{i % 256}.0/24": {"next_hop": "192.0.2.1", "metric": i} for i in range(6000)}
+    data = {"status": "completed", "device": "R1", "output": {"vrf": {"default": {"routes": routes}}}}
+    handles = ResultHandles()
+
+    first = handles.first_page(data)
+    page = first["page"]
+    assert page["path"] == "output.vrf.default.routes"
+    assert page["unit"] == "keys"
+    assert page["total"] == 6000
+    assert first["device"] == "R1"
+    assert len(first["output"]["vrf"]["default"]["routes"]) == page["returned"] < 6000
+
+    seen = dict(first["output"]["vrf"]["default"]["routes"])
+    offset = page["next_offset"]
+    while offset is not None:
+        more = handles.page(page["handle"], offset)
+        seen.update(more["output"]["vrf"]["default"]["routes"])
+        offset = more["page"]["next_offset"]
+    assert seen == routes
+
+
+def test_pages_multi_line_output_by_lines():
+    text = "\n".join(f"line {i:06d} " + "x" * 40 for i in range(8000))
+    first = ResultHandles().first_page({"status": "completed_raw", "output": text})
+    assert first["page"]["unit"] == "lines"
+    assert first["page"]["total"] == 8000
+    assert first["output"] == "\n".join(text.splitlines()[:first["page"]["returned"]])
+
+
+def test_single_line_blob_is_paged_by_characters():
+    blob = "A" * (500 * 1024)
+    handles = ResultHandles()
+
+    first = handles.first_page({"status": "completed_raw", "output": blob})
+    page = first["page"]
+    assert page["path"] == "output"
+    assert page["unit"] == "chars"
+    assert page["total"] == len(blob)
+    assert len(first["output"]) <= PAGE_TARGET_BYTES
+
+    parts = [first["output"]]
+    offset = page["next_offset"]
+    while offset is not None:
+        more = handles.page(page["handle"], offset)
+        assert len(more["output"]) <= PAGE_TARGET_BYTES
+        parts.append(more["output"])
+        offset = more["page"]["next_offset"]
+    assert "".join(parts) == blob
+
+
+def test_one_huge_line_among_short_ones_is_paged_by_characters():
+    text = "header\n" + "B" * (2 * PAGE_THRESHOLD_BYTES) + "\nfooter"
+    first = ResultHandles().first_page({"status": "completed_raw", "output": text})
+    assert first["page"]["unit"] == "chars"
+    assert len(first["output"]) <= PAGE_TARGET_BYTES
+
+
+def test_unknown_handle_and_release():
+    handles = ResultHandles()
+    assert handles.page("h-missing")["status"] == "error"
+    first = handles.first_page({"output": list(range(100000))})
+    handle = first["page"]["handle"]
+    assert handles.release(handle)
+    assert handles.page(handle)["status"] == "error"
+
+
+def test_expired_handles_are_dropped(monkeypatch):
+    handles = ResultHandles()
+    first = handles.first_page({"output": list(range(100000))})
+    monkeypatch.setattr(server, "HANDLE_TTL", -1.0)
+    assert handles.page(first["page"]["handle"])["status"] == "error"
+    assert handles.stats()["handles"] == 0